@@ -0,0 +1,226 @@
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+
+from Profiling import PhaseTimer, instrument
+from RLModel import SchedulingEnv
+
+
+class BatchedSchedulingEnv(VecEnv):
+    """N independent SchedulingEnv episodes simulated in one process.
+
+    Occupancy is held as (N, entities, slots) arrays and validity, reward and
+    observation are computed for every env at once with NumPy, so stepping
+    costs a handful of vectorized ops instead of N Python env steps and no IPC.
+    Rewards, observations, dones and infos match N copies of SchedulingEnv
+    behind a DummyVecEnv, including auto-reset and terminal_observation.
+
+    profile=True times step_wait as env_step and observation building, for
+    the whole batch; validity and reward are computed inline for every env.
+    """
+
+    def __init__(self, teachers_df, students_df, rooms_df, times_df, num_envs, max_steps=1000, pad_to=None,
+                 profile=False):
+        # Reference env: provides the id lists, compiled tables and spaces so
+        # both implementations stay in lockstep.
+        self.reference = SchedulingEnv(teachers_df, students_df, rooms_df, times_df, max_steps=max_steps,
+                                       pad_to=pad_to)
+        self.tables = self.reference.tables
+        self.max_steps = max_steps
+
+        self.teacher_ids = self.reference.teacher_ids
+        self.student_ids = self.reference.student_ids
+        self.room_ids = self.reference.room_ids
+        self.time_slots = self.reference.time_slots
+
+        self.num_teachers = len(self.teacher_ids)
+        self.num_students = len(self.student_ids)
+        self.num_rooms = len(self.room_ids)
+        self.num_slots = len(self.time_slots)
+
+        self.teacher_capacity = self.reference.teacher_capacity
+        self._scheduled_offset = self.reference._scheduled_offset
+        self._capacity_offset = self.reference._capacity_offset
+        self.render_mode = None
+        super().__init__(num_envs, self.reference.observation_space, self.reference.action_space)
+
+        n = num_envs
+        self.teacher_busy = np.zeros((n, self.num_teachers, self.num_slots), dtype=bool)
+        self.room_busy = np.zeros((n, self.num_rooms, self.num_slots), dtype=bool)
+        self.student_busy = np.zeros((n, self.num_students, self.num_slots), dtype=bool)
+        self.student_scheduled = np.zeros((n, self.num_students), dtype=bool)
+        self.pair_scheduled = np.zeros((n, self.num_teachers, self.num_students), dtype=bool)
+        self.room_free_count = np.full((n, self.num_slots), self.num_rooms, dtype=np.int64)
+        self.num_scheduled_students = np.zeros(n, dtype=np.int64)
+        self.teacher_load = np.zeros((n, self.num_teachers), dtype=np.int64)
+        self.current_student_index = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+
+        self._env_range = np.arange(n)
+        self._mask_offsets = self.reference._mask_offsets
+        self._actions = None
+
+        self.phase_timer = None
+        if profile:
+            self.phase_timer = PhaseTimer()
+            instrument(self, self.phase_timer, (("env_step", "step_wait"), ("obs_build", "_get_obs")))
+
+    def _reset_envs(self, env_idx):
+        self.teacher_busy[env_idx] = False
+        self.room_busy[env_idx] = False
+        self.student_busy[env_idx] = False
+        self.student_scheduled[env_idx] = False
+        self.pair_scheduled[env_idx] = False
+        self.room_free_count[env_idx] = self.num_rooms
+        self.num_scheduled_students[env_idx] = 0
+        self.teacher_load[env_idx] = 0
+        self.current_student_index[env_idx] = 0
+        self.steps[env_idx] = 0
+
+    def _get_obs(self):
+        obs = np.zeros((self.num_envs,) + self.observation_space.shape, dtype=np.float32)
+        active = self.current_student_index < self.num_students
+        offset = self._scheduled_offset
+        obs[active, :self.num_teachers] = self.tables.compatible_obs[self.current_student_index[active]]
+        obs[active, offset:offset + self.num_students] = self.student_scheduled[active]
+        offset = self._capacity_offset
+        obs[active, offset:offset + self.num_teachers] = \
+            (self.teacher_capacity - self.teacher_load[active]) / self.num_slots
+        return obs
+
+    def reset(self):
+        self._reset_envs(self._env_range)
+        self._reset_seeds()
+        self._reset_options()
+        return self._get_obs()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, 3)
+
+    def step_wait(self):
+        teacher_idx, room_idx, time_slot = self._actions.T
+        student_idx = self.current_student_index
+        self.steps += 1
+
+        # Only a finished student list ends the episode; padded action
+        # indices are invalid actions, as in SchedulingEnv.
+        out_of_bounds = student_idx >= self.num_students
+        in_bounds = ~out_of_bounds
+        padded = (teacher_idx >= self.num_teachers) | (room_idx >= self.num_rooms) | (time_slot >= self.num_slots)
+
+        # Clip so every env can be gathered from; out of bounds and padded
+        # envs are excluded from the result below.
+        t = np.minimum(teacher_idx, self.num_teachers - 1)
+        r = np.minimum(room_idx, self.num_rooms - 1)
+        s = np.minimum(student_idx, self.num_students - 1)
+        sl = np.minimum(time_slot, self.num_slots - 1)
+        e = self._env_range
+
+        clash = self.teacher_busy[e, t, sl] | self.student_busy[e, s, sl] | self.room_busy[e, r, sl]
+        at_capacity = self.teacher_load[e, t] >= self.teacher_capacity[t]
+        valid = in_bounds & ~padded & self.tables.compatible[s, t] & ~at_capacity & ~clash
+        invalid = in_bounds & ~valid
+
+        first_time = ~self.student_scheduled[e, s]
+        new_pair = ~self.pair_scheduled[e, t, s]
+
+        rewards = np.where(valid, 1.0 + 2.0 * first_time + 0.5 * new_pair, 0.0)
+        rewards[invalid] = -10.0
+        rewards[out_of_bounds] = -1.0
+
+        # Place the valid lessons
+        ve, vt, vr, vs, vsl = e[valid], t[valid], r[valid], s[valid], sl[valid]
+        self.teacher_busy[ve, vt, vsl] = True
+        self.room_busy[ve, vr, vsl] = True
+        self.room_free_count[ve, vsl] -= 1
+        self.student_busy[ve, vs, vsl] = True
+        self.pair_scheduled[ve, vt, vs] = True
+        self.teacher_load[ve, vt] += 1
+        self.num_scheduled_students[ve] += first_time[valid]
+        self.student_scheduled[ve, vs] = True
+        self.current_student_index[ve] += 1
+
+        all_scheduled = in_bounds & (self.num_scheduled_students == self.num_students)
+        truncated = in_bounds & (self.steps >= self.max_steps)
+        dones = out_of_bounds | truncated | all_scheduled
+        rewards[all_scheduled] += 5.0
+
+        obs = self._get_obs()
+        infos = []
+        for i in range(self.num_envs):
+            if out_of_bounds[i]:
+                info = {"error": "index out of bounds"}
+            else:
+                info = {}
+                if invalid[i]:
+                    info["error"] = "invalid action"
+                info["coverage"] = self.num_scheduled_students[i] / self.num_students
+                info["new_lesson"] = (
+                    self.teacher_ids[t[i]], self.student_ids[s[i]], self.room_ids[r[i]], self.time_slots[sl[i]]
+                ) if valid[i] else None
+            # SchedulingEnv reports done=True whenever it truncates, so
+            # DummyVecEnv never flags a pure time-limit truncation.
+            info["TimeLimit.truncated"] = False
+            if dones[i]:
+                info["terminal_observation"] = obs[i].copy()
+            infos.append(info)
+
+        if dones.any():
+            self._reset_envs(e[dones])
+            obs = self._get_obs()
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def action_masks(self):
+        """Batched SchedulingEnv.action_masks(), one row per env."""
+        n = self.num_envs
+        masks = np.zeros((n, self._mask_offsets[-1]), dtype=bool)
+        teacher_mask = masks[:, self._mask_offsets[0]:self._mask_offsets[0] + self.num_teachers]
+        room_mask = masks[:, self._mask_offsets[1]:self._mask_offsets[1] + self.num_rooms]
+        slot_mask = masks[:, self._mask_offsets[2]:self._mask_offsets[2] + self.num_slots]
+
+        active = self.current_student_index < self.num_students
+        s = np.minimum(self.current_student_index, self.num_students - 1)
+        open_slots = ~self.student_busy[self._env_range, s] & (self.room_free_count > 0)
+        teacher_slots = ~self.teacher_busy & open_slots[:, None, :]
+        teacher_slots &= (self.tables.compatible[s] & (self.teacher_load < self.teacher_capacity))[:, :, None]
+        teacher_slots &= active[:, None, None]
+
+        teacher_mask[:] = teacher_slots.any(axis=2)
+        slot_mask[:] = teacher_slots.any(axis=1)
+        room_mask[:] = (~self.room_busy & slot_mask[:, None, :]).any(axis=2)
+
+        stuck = ~teacher_mask.any(axis=1) | ~room_mask.any(axis=1) | ~slot_mask.any(axis=1)
+        teacher_mask[stuck] = True
+        room_mask[stuck] = True
+        slot_mask[stuck] = True
+        return masks
+
+    def close(self):
+        pass
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        # Per-env state lives in the batched arrays; expose the row for each env
+        value = getattr(self, attr_name)
+        if isinstance(value, np.ndarray) and value.shape[:1] == (self.num_envs,):
+            return [value[i] for i in self._indices(indices)]
+        return [value for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        raise AttributeError("BatchedSchedulingEnv state cannot be set per env")
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # MaskablePPO fetches masks through env_method("action_masks")
+        if method_name == "action_masks":
+            masks = self.action_masks()
+            return [masks[i] for i in self._indices(indices)]
+        raise AttributeError(f"BatchedSchedulingEnv does not support env_method('{method_name}')")
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
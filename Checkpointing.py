@@ -0,0 +1,178 @@
+import io
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+LATEST_NAME = "latest.json"
+
+
+def _write_atomic(path, data):
+    # Readers only ever see a missing or a complete file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_model_atomic(model, path):
+    """model.save(path) via a temporary file, so a crash never leaves a truncated zip."""
+    path = str(path)
+    if not path.endswith(".zip"):
+        path += ".zip"
+    buffer = io.BytesIO()
+    model.save(buffer)
+    _write_atomic(path, buffer.getvalue())
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """Periodically snapshots training so a run can resume where it stopped.
+
+    Every `save_freq` timesteps, at the start of the next rollout (right
+    after a PPO update, so the snapshot matches num_timesteps exactly), the
+    model is serialized to memory: policy weights, optimizer state and
+    num_timesteps. The state of `logger_callback` and of every callback in
+    `state_callbacks` ({name: callback}, e.g. the curriculum) is captured
+    with it. The
+    bytes are then written to `save_dir` on a background thread, while the
+    next rollout is already being collected. Each file is written to a
+    temporary path and renamed. latest.json is updated last, so it always
+    points at a complete checkpoint. Only the newest `keep_last`
+    checkpoints are kept.
+    """
+
+    def __init__(self, save_dir="checkpoints", save_freq=50000, keep_last=3, logger_callback=None,
+                 state_callbacks=None, verbose=1):
+        super(AsyncCheckpointCallback, self).__init__(verbose)
+        self.save_dir = save_dir
+        self.save_freq = save_freq
+        self.keep_last = keep_last
+        self.logger_callback = logger_callback
+        self.state_callbacks = state_callbacks or {}
+        self._next_save = None
+        self._executor = None
+        self._pending = None
+        self._saved = []
+
+    def _on_training_start(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+        # Checkpoints from before a restart count towards keep_last
+        self._saved = [
+            (os.path.join(self.save_dir, name), os.path.join(self.save_dir, name[:-len(".zip")] + ".state.pkl"))
+            for name in sorted(os.listdir(self.save_dir))
+            if name.startswith("checkpoint_") and name.endswith(".zip")
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._next_save = (self.num_timesteps // self.save_freq + 1) * self.save_freq
+
+    def _on_rollout_start(self):
+        if self.num_timesteps >= self._next_save:
+            self.save()
+            self._next_save = (self.num_timesteps // self.save_freq + 1) * self.save_freq
+
+    def _on_step(self) -> bool:
+        return True
+
+    def save(self):
+        """Snapshot now and hand the write to the background thread."""
+        # At most one write in flight; a slow disk delays this snapshot
+        # rather than piling up copies of the model in memory.
+        self.wait()
+
+        buffer = io.BytesIO()
+        self.model.save(buffer)
+        state = {
+            "logger": self.logger_callback.state_dict() if self.logger_callback is not None else None,
+            "callbacks": {name: callback.state_dict() for name, callback in self.state_callbacks.items()},
+        }
+        self._pending = self._executor.submit(self._write, self.num_timesteps, buffer.getvalue(),
+                                              pickle.dumps(state))
+
+    def _write(self, timesteps, model_bytes, state_bytes):
+        name = f"checkpoint_{timesteps:012d}"
+        model_path = os.path.join(self.save_dir, f"{name}.zip")
+        state_path = os.path.join(self.save_dir, f"{name}.state.pkl")
+        _write_atomic(model_path, model_bytes)
+        _write_atomic(state_path, state_bytes)
+
+        latest = {"timesteps": timesteps, "model": f"{name}.zip", "state": f"{name}.state.pkl"}
+        _write_atomic(os.path.join(self.save_dir, LATEST_NAME), json.dumps(latest).encode())
+
+        if (model_path, state_path) in self._saved:
+            self._saved.remove((model_path, state_path))
+        self._saved.append((model_path, state_path))
+        while len(self._saved) > self.keep_last:
+            for path in self._saved.pop(0):
+                if os.path.exists(path):
+                    os.remove(path)
+        if self.verbose >= 1:
+            print(f"Checkpoint at {timesteps} timesteps saved to {model_path}")
+
+    def wait(self):
+        """Block until the last checkpoint is on disk, re-raising any write error."""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def _on_training_end(self):
+        self.wait()
+        self._executor.shutdown()
+
+
+def find_latest_checkpoint(save_dir="checkpoints"):
+    """Paths and timesteps of the newest complete checkpoint in save_dir, or None."""
+    latest_path = os.path.join(save_dir, LATEST_NAME)
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path) as f:
+        latest = json.load(f)
+    latest["model"] = os.path.join(save_dir, latest["model"])
+    latest["state"] = os.path.join(save_dir, latest["state"])
+    return latest
+
+
+def clear_checkpoints(save_dir="checkpoints"):
+    """Delete every checkpoint and latest.json in save_dir, e.g. once a run has saved its final model."""
+    if not os.path.isdir(save_dir):
+        return
+    for name in os.listdir(save_dir):
+        if name == LATEST_NAME or name.startswith("checkpoint_"):
+            os.remove(os.path.join(save_dir, name))
+
+
+def restore_checkpoint(algorithm, env, save_dir="checkpoints", logger_callback=None, state_callbacks=None,
+                       **load_kwargs):
+    """Load the newest checkpoint onto env, or return None if there is none.
+
+    The returned model carries the checkpoint's num_timesteps; continue with
+    model.learn(total - model.num_timesteps, reset_num_timesteps=False) to
+    finish at exactly `total` timesteps. logger_callback, if given, picks
+    up its running statistics and truncates its log to the checkpoint, and
+    each of state_callbacks ({name: callback}, as given to
+    AsyncCheckpointCallback) gets back the state saved under its name.
+    """
+    latest = find_latest_checkpoint(save_dir)
+    if latest is None:
+        return None
+
+    model = algorithm.load(latest["model"], env=env, **load_kwargs)
+    # The saved last observation belongs to the old envs; start from a reset
+    model._last_obs = None
+
+    with open(latest["state"], "rb") as f:
+        state = pickle.load(f)
+    if state is None or "callbacks" not in state:
+        # Checkpoints from before state_callbacks hold only the logger state
+        state = {"logger": state, "callbacks": {}}
+    if logger_callback is not None and state["logger"] is not None:
+        logger_callback.load_state_dict(state["logger"])
+    for name, callback in (state_callbacks or {}).items():
+        if name in state["callbacks"]:
+            callback.load_state_dict(state["callbacks"][name])
+
+    print(f"Resuming from {latest['model']} at {model.num_timesteps} timesteps")
+    return model
@@ -0,0 +1,122 @@
+from collections import deque
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from DatasetGenerator import generate_dataset
+from RLModel import SchedulingInstance
+from TrainingLogger import RunningWindow
+
+
+class InstancePool:
+    """Random instances for SchedulingEnv.reset, grouped into curriculum levels.
+
+    Each level is a maximum (teachers, students, rooms, slots) size; its
+    instances draw every dimension between half that size and the size
+    itself. A level has `pool_size` instances, and entry i of level l is
+    always generated from the seed (seed, l, i), so the pool is reproducible
+    without being stored.
+
+    Only `cache_size` compiled SchedulingInstances of the current level are
+    kept, and resets sample from those, so a reset is a list lookup and
+    memory stays bounded however long training runs. Every `refresh_every`
+    samples the oldest `batch_size` of them are replaced by the next batch
+    of the pool, so training still cycles through all of it.
+    """
+
+    def __init__(self, levels, pool_size=512, cache_size=128, batch_size=16, refresh_every=256, seed=0,
+                 max_hours=True):
+        self.levels = [tuple(int(size) for size in level) for level in levels]
+        self.pool_size = pool_size
+        self.cache_size = min(cache_size, pool_size)
+        self.batch_size = min(batch_size, self.cache_size)
+        self.refresh_every = refresh_every
+        self.seed = seed
+        self.max_hours = max_hours
+        self.level = 0
+        self.generated = 0
+        self._instances = deque()
+        self._cursor = 0
+        self._samples = 0
+        self._fill(self.cache_size)
+
+    @property
+    def max_sizes(self):
+        """Elementwise maximum over the levels, the padding every instance fits."""
+        return tuple(int(size) for size in np.max(self.levels, axis=0))
+
+    def set_level(self, level):
+        level = min(max(int(level), 0), len(self.levels) - 1)
+        if level != self.level:
+            self.level = level
+            self._instances.clear()
+            self._cursor = 0
+            self._fill(self.cache_size)
+
+    def _generate(self, level, index):
+        rng = np.random.default_rng([self.seed, level, index])
+        max_sizes = np.array(self.levels[level])
+        sizes = rng.integers(np.maximum(1, max_sizes // 2), max_sizes + 1)
+        dataset = generate_dataset(*(int(size) for size in sizes), seed=int(rng.integers(2 ** 31)),
+                                   max_hours=self.max_hours)
+        return SchedulingInstance(*dataset)
+
+    def _fill(self, count):
+        # Next `count` pool entries in, the oldest ones out
+        for _ in range(count):
+            self._instances.append(self._generate(self.level, self._cursor))
+            self._cursor = (self._cursor + 1) % self.pool_size
+            self.generated += 1
+        while len(self._instances) > self.cache_size:
+            self._instances.popleft()
+
+    def sample(self, rng):
+        """A random cached instance of the current level; rng is the env's np_random."""
+        self._samples += 1
+        if self._samples % self.refresh_every == 0 and self.cache_size < self.pool_size:
+            self._fill(self.batch_size)
+        return self._instances[int(rng.integers(len(self._instances)))]
+
+
+class CurriculumCallback(BaseCallback):
+    """Moves every env to the next InstancePool level as coverage improves.
+
+    Once `window` episodes have finished at the current level and their mean
+    coverage reaches `promote_at`, the level goes up by one through
+    env_method, which also reaches SubprocVecEnv workers.
+    """
+
+    def __init__(self, num_levels, promote_at=0.9, window=50, verbose=1):
+        super(CurriculumCallback, self).__init__(verbose)
+        self.num_levels = num_levels
+        self.promote_at = promote_at
+        self.window = window
+        self.level = 0
+        self.coverages = RunningWindow(window)
+
+    def _on_step(self) -> bool:
+        dones = self.locals["dones"]
+        if dones.any():
+            infos = self.locals["infos"]
+            for env_idx in np.flatnonzero(dones):
+                self.coverages.append(infos[env_idx].get("coverage", 0.0))
+
+            if self.level < self.num_levels - 1 and self.coverages.count >= self.window and \
+                    self.coverages.mean() >= self.promote_at:
+                self.level += 1
+                self.training_env.env_method("set_instance_level", self.level)
+                self.coverages = RunningWindow(self.window)
+                if self.verbose >= 1:
+                    print(f"Curriculum level {self.level} at timestep {self.num_timesteps}")
+
+        self.logger.record("curriculum/level", self.level)
+        return True
+
+    def state_dict(self):
+        """Level and coverage window, saved with checkpoints so a resumed run keeps its promotions."""
+        return {"level": self.level, "coverages": self.coverages}
+
+    def load_state_dict(self, state):
+        """Continue from state_dict(); the envs still need set_instance_level before training."""
+        self.level = state["level"]
+        self.coverages = state["coverages"]
@@ -0,0 +1,152 @@
+import ast
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import INSTRUMENTS, SLOT_HOURS
+
+DATASET_NAMES = ("teachers", "students", "rooms", "times")
+
+INSTRUMENT_CODES = {name: code for code, name in enumerate(INSTRUMENTS)}
+
+REQUIRED_COLUMNS = {
+    "teachers": ["Teacher_ID"],
+    "students": ["Student_ID", "Instrument"],
+    "rooms": ["Room_ID"],
+    "times": ["Time Slot"],
+}
+
+
+def parse_instruments(value):
+    # Older teachers.csv files store the instrument list as a stringified Python list
+    if isinstance(value, str):
+        value = ast.literal_eval(value) if value.startswith("[") else value.split("|")
+    return list(value)
+
+
+def encode_instruments(names):
+    """Bitmask with bit INSTRUMENT_CODES[name] set for every instrument in names."""
+    mask = 0
+    for name in names:
+        if name not in INSTRUMENT_CODES:
+            raise ValueError(f"Unknown instrument '{name}', expected one of {INSTRUMENTS}")
+        mask |= 1 << INSTRUMENT_CODES[name]
+    return mask
+
+
+def decode_instrument_mask(mask):
+    return [name for name, code in INSTRUMENT_CODES.items() if mask >> code & 1]
+
+
+def normalize_teachers(teachers_df):
+    """Return teachers with an int64 Instrument_Mask column.
+
+    Frames that already carry the mask are range-checked; legacy frames with
+    an Instruments list column (real or stringified) are encoded once here
+    and the list column is dropped. An optional Max_Hours_Per_Week column is
+    checked and stored as float64.
+    """
+    teachers = teachers_df.reset_index(drop=True)
+    if "Instrument_Mask" in teachers.columns:
+        masks = teachers["Instrument_Mask"].to_numpy(dtype=np.int64)
+        if (masks <= 0).any() or (masks >> len(INSTRUMENTS)).any():
+            raise ValueError("Instrument_Mask values must be non-empty bitmasks over config.INSTRUMENTS")
+        teachers["Instrument_Mask"] = masks
+    elif "Instruments" in teachers.columns:
+        masks = [encode_instruments(parse_instruments(value)) for value in teachers["Instruments"]]
+        teachers["Instrument_Mask"] = np.array(masks, dtype=np.int64)
+        teachers = teachers.drop(columns=["Instruments"])
+    else:
+        raise ValueError("teachers needs an Instrument_Mask or Instruments column")
+
+    if "Max_Hours_Per_Week" in teachers.columns:
+        hours = pd.to_numeric(teachers["Max_Hours_Per_Week"], errors="coerce")
+        if hours.isna().any() or (hours < 0).any():
+            raise ValueError("Max_Hours_Per_Week values must be non-negative numbers")
+        teachers["Max_Hours_Per_Week"] = hours.to_numpy(dtype=np.float64)
+    return teachers
+
+
+def teacher_capacity(teachers, num_slots):
+    """Lessons each teacher may take: Max_Hours_Per_Week in SLOT_HOURS lessons, capped at num_slots.
+
+    Teachers without a Max_Hours_Per_Week column can take a lesson in every slot.
+    """
+    if "Max_Hours_Per_Week" not in teachers.columns:
+        return np.full(len(teachers), num_slots, dtype=np.int64)
+    # Small epsilon so e.g. 1.5 hours of 0.5 hour slots is 3 lessons, not 2
+    lessons = np.floor(teachers["Max_Hours_Per_Week"].to_numpy(dtype=np.float64) / SLOT_HOURS + 1e-9)
+    return np.minimum(lessons, num_slots).astype(np.int64)
+
+
+def normalize_students(students_df):
+    """Return students with an int64 Instrument_Code column."""
+    students = students_df.reset_index(drop=True)
+    codes = students["Instrument"].map(INSTRUMENT_CODES)
+    if codes.isna().any():
+        unknown = sorted(students.loc[codes.isna(), "Instrument"].astype(str).unique())
+        raise ValueError(f"Unknown instruments {unknown}, expected one of {INSTRUMENTS}")
+    students["Instrument_Code"] = codes.to_numpy(dtype=np.int64)
+    return students
+
+
+def validate_dataset(teachers, students, rooms, times):
+    """Normalize and check a (teachers, students, rooms, times) dataset once at load time."""
+    frames = {"teachers": teachers, "students": students, "rooms": rooms, "times": times}
+    for name, df in frames.items():
+        missing = [column for column in REQUIRED_COLUMNS[name] if column not in df.columns]
+        if missing:
+            raise ValueError(f"{name} is missing columns {missing}")
+        if df.empty:
+            raise ValueError(f"{name} is empty")
+
+    for name, column in (("teachers", "Teacher_ID"), ("students", "Student_ID"), ("rooms", "Room_ID")):
+        if frames[name][column].duplicated().any():
+            raise ValueError(f"{name} has duplicate {column} values")
+
+    return normalize_teachers(teachers), normalize_students(students), rooms.reset_index(drop=True), \
+        times.reset_index(drop=True)
+
+
+def is_normalized(teachers, students):
+    return "Instrument_Mask" in teachers.columns and "Instrument_Code" in students.columns
+
+
+def read_table(path):
+    # Prefer the Parquet copy DatasetGenerator writes next to each CSV: it
+    # loads in milliseconds and keeps column types exact.
+    parquet_path = os.path.splitext(path)[0] + ".parquet"
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    return pd.read_csv(path)
+
+
+def load_dataset(paths):
+    """Load and validate the (teachers, students, rooms, times) tables."""
+    return validate_dataset(*(read_table(path) for path in paths))
+
+
+SCHEDULE_COLUMNS = ["Teacher_ID", "Student_ID", "Room_ID", "Time Slot"]
+
+
+def save_schedule(schedule, path):
+    """Write (teacher, student, room, time) lesson tuples with named columns."""
+    pd.DataFrame(list(schedule), columns=SCHEDULE_COLUMNS).to_csv(path, index=False)
+
+
+def load_schedule(path):
+    """Read a schedule CSV, including older ones written with 0-3 column headers.
+
+    Named columns are matched by name, so their order does not matter and
+    extra columns (such as ScheduleValidator's Violation) are kept after
+    SCHEDULE_COLUMNS.
+    """
+    schedule = pd.read_csv(path)
+    if list(schedule.columns[:len(SCHEDULE_COLUMNS)]) == ["0", "1", "2", "3"]:
+        schedule = schedule.rename(columns=dict(zip(["0", "1", "2", "3"], SCHEDULE_COLUMNS)))
+    missing = [column for column in SCHEDULE_COLUMNS if column not in schedule.columns]
+    if missing:
+        raise ValueError(f"schedule {path} is missing columns {missing}")
+    extra = [column for column in schedule.columns if column not in SCHEDULE_COLUMNS]
+    return schedule[SCHEDULE_COLUMNS + extra]
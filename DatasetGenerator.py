@@ -1,105 +1,119 @@
-import pandas as pd
-import numpy as np
-from faker import Faker
-import random
-from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS
+import argparse
+import os
 
+import numpy as np
+import pandas as pd
+from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS, SLOT_HOURS, INSTRUMENTS
+from DataSchema import DATASET_NAMES
 
-def generate_test_data():
-    fake = Faker()
-
-    np.random.seed(42)
 
-    # Parameters
-    number_teachers = random.randint(1, MAX_TEACHERS)
-    number_students = random.randint(1, MAX_STUDENTS)
-    number_rooms = random.randint(1, MAX_ROOMS)
+def generate_dataset(num_teachers, num_students, num_rooms, num_slots, seed=42, max_hours=False):
+    """Generate a random instance as (teachers, students, rooms, times) DataFrames.
 
-    # Generate all possible time slots
-    all_time_slots = pd.date_range("2025-01-01 08:00", "2025-05-01 17:00", freq="30min")
+    All draws come from one seeded NumPy generator and are vectorized, so
+    school-scale instances (thousands of students, weeks of slots) take
+    milliseconds and the same seed always gives the same data.
+    """
+    rng = np.random.default_rng(seed)
+    instruments = np.array(INSTRUMENTS)
 
-    # Restrict to the first `TIME_SLOTS` entries
-    time_slots = all_time_slots[:TIME_SLOTS]
+    # Each teacher teaches 1-3 distinct instruments: rank random keys per row,
+    # keep the first k columns of the permutation and OR their bits together
+    # into the DataSchema instrument bitmask.
+    skill_counts = rng.integers(1, 4, num_teachers)
+    permutations = rng.random((num_teachers, len(INSTRUMENTS))).argsort(axis=1)
+    chosen = np.arange(len(INSTRUMENTS))[None, :] < skill_counts[:, None]
+    instrument_masks = np.where(chosen, np.left_shift(1, permutations), 0).sum(axis=1).astype(np.int64)
 
     # Generate Teachers
     teachers = pd.DataFrame({
-        "Teacher_ID": [f"T{i:03d}" for i in range(1, number_teachers + 1)],
-        "Instruments": [random.sample(["Piano", "Guitar", "Violin", "Drums"], k=random.randint(1, 3)) for _ in
-                        range(number_teachers)],
-        "Max_Hours_Per_Week": np.random.randint(5, 15, number_teachers)
+        "Teacher_ID": [f"T{i:03d}" for i in range(1, num_teachers + 1)],
+        "Instrument_Mask": instrument_masks,
     })
+    if max_hours:
+        teachers["Max_Hours_Per_Week"] = rng.integers(5, 15, num_teachers)
 
     # Generate Students
     students = pd.DataFrame({
-        "Student_ID": [f"S{i:03d}" for i in range(1, number_students + 1)],
-        "Instrument": [random.choice(["Piano", "Guitar", "Violin", "Drums"]) for _ in range(number_students)],
+        "Student_ID": [f"S{i:03d}" for i in range(1, num_students + 1)],
+        "Instrument": instruments[rng.integers(0, len(INSTRUMENTS), num_students)],
     })
 
     # Generate Rooms
     rooms = pd.DataFrame({
-        "Room_ID": [f"R{i:02d}" for i in range(1, number_rooms + 1)],
+        "Room_ID": [f"R{i:02d}" for i in range(1, num_rooms + 1)],
     })
 
-    print("Teachers:\n", teachers.head())
-    print("\nStudents:\n", students.head())
-    print("\nRooms:\n", rooms.head())
-
-    teachers.to_csv("teachers_test.csv", index=False)
-    students.to_csv("students_test.csv", index=False)
-    rooms.to_csv("rooms_test.csv", index=False)
+    # Consecutive SLOT_HOURS slots, stored as the same strings the CSVs hold
+    time_slots = pd.date_range("2025-01-01 08:00", periods=num_slots, freq=f"{int(SLOT_HOURS * 60)}min")
+    times = pd.DataFrame({"Time Slot": time_slots.astype(str)})
 
+    return teachers, students, rooms, times
 
-def generate_train_data():
-    np.random.seed(42)
 
-    # Parameters
-    # Generate all possible time slots
-    all_time_slots = pd.date_range("2025-01-01 08:00", "2025-05-01 17:00", freq="30min")
-
-    # Restrict to the first `TIME_SLOTS` entries
-    time_slots = all_time_slots[:TIME_SLOTS]
-
-    # Generate Teachers
-    teachers = pd.DataFrame({
-        "Teacher_ID": [f"T{i:03d}" for i in range(1, MAX_TEACHERS + 1)],
-        "Instruments": [random.sample(["Piano", "Guitar", "Violin", "Drums"], k=random.randint(1, 3)) for _ in
-                        range(MAX_TEACHERS)],
-    })
-
-    # Generate Students
-    students = pd.DataFrame({
-        "Student_ID": [f"S{i:03d}" for i in range(1, MAX_STUDENTS + 1)],
-        "Instrument": [random.choice(["Piano", "Guitar", "Violin", "Drums"]) for _ in range(MAX_STUDENTS)],
-    })
-
-    # Generate Rooms
-    rooms = pd.DataFrame({
-        "Room_ID": [f"R{i:02d}" for i in range(1, MAX_ROOMS + 1)],
-    })
-
-    times = pd.DataFrame(time_slots, columns=["Time Slot"])
+def save_dataset(dataset, suffix="", out_dir=".", formats=("csv", "parquet")):
+    """Write each frame as <name><suffix>.csv and/or .parquet in out_dir."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in zip(DATASET_NAMES, dataset):
+        path = os.path.join(out_dir, f"{name}{suffix}")
+        if "csv" in formats:
+            df.to_csv(f"{path}.csv", index=False)
+        if "parquet" in formats:
+            df.to_parquet(f"{path}.parquet", index=False)
 
 
+def print_dataset(dataset):
+    teachers, students, rooms, times = dataset
     print("Teachers:\n", teachers.head())
     print("\nStudents:\n", students.head())
     print("\nRooms:\n", rooms.head())
     print("\nTimes:\n", times.head())
 
-    teachers.to_csv("teachers.csv", index=False)
-    students.to_csv("students.csv", index=False)
-    rooms.to_csv("rooms.csv", index=False)
-    times.to_csv("times.csv", index=False)
-
 
-def main():
-    dataset_generation = input("Enter 1 for training data and 2 for test data")
+def generate_test_data(seed=42, out_dir=".", formats=("csv", "parquet")):
+    rng = np.random.default_rng(seed)
 
-    if dataset_generation == "1":
-        generate_train_data()
-    elif dataset_generation == "2":
-        generate_test_data()
+    # Parameters
+    number_teachers = int(rng.integers(1, MAX_TEACHERS + 1))
+    number_students = int(rng.integers(1, MAX_STUDENTS + 1))
+    number_rooms = int(rng.integers(1, MAX_ROOMS + 1))
+
+    dataset = generate_dataset(number_teachers, number_students, number_rooms, TIME_SLOTS, seed=seed, max_hours=True)
+    print_dataset(dataset)
+    save_dataset(dataset, suffix="_test", out_dir=out_dir, formats=formats)
+
+
+def generate_train_data(seed=42, out_dir=".", formats=("csv", "parquet")):
+    dataset = generate_dataset(MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS, seed=seed, max_hours=True)
+    print_dataset(dataset)
+    save_dataset(dataset, out_dir=out_dir, formats=formats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic scheduling datasets.")
+    parser.add_argument("kind", choices=["train", "test", "custom"],
+                        help="train/test use the config.py sizes, custom uses the size options")
+    parser.add_argument("--teachers", type=int, default=MAX_TEACHERS)
+    parser.add_argument("--students", type=int, default=MAX_STUDENTS)
+    parser.add_argument("--rooms", type=int, default=MAX_ROOMS)
+    parser.add_argument("--slots", type=int, default=TIME_SLOTS)
+    parser.add_argument("--max-hours", action="store_true", help="add a Max_Hours_Per_Week column (custom only)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--suffix", default="", help="file name suffix (custom only), e.g. _large")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--format", nargs="+", choices=["csv", "parquet"], default=["csv", "parquet"],
+                        dest="formats")
+    args = parser.parse_args(argv)
+
+    if args.kind == "train":
+        generate_train_data(args.seed, args.out_dir, args.formats)
+    elif args.kind == "test":
+        generate_test_data(args.seed, args.out_dir, args.formats)
     else:
-        print("Enter valid input")
+        dataset = generate_dataset(args.teachers, args.students, args.rooms, args.slots,
+                                   seed=args.seed, max_hours=args.max_hours)
+        print_dataset(dataset)
+        save_dataset(dataset, suffix=args.suffix, out_dir=args.out_dir, formats=args.formats)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Outcome codes recorded for every SchedulingEnv step
+OUTCOME_PLACED = 0
+OUTCOME_INVALID = 1
+OUTCOME_OUT_OF_BOUNDS = 2
+OUTCOME_NAMES = {
+    OUTCOME_PLACED: "placed",
+    OUTCOME_INVALID: "invalid",
+    OUTCOME_OUT_OF_BOUNDS: "out_of_bounds",
+}
+
+EVENT_DTYPE = np.dtype([
+    ("step", np.int64),
+    ("student", np.int64),
+    ("teacher", np.int64),
+    ("room", np.int64),
+    ("time_slot", np.int64),
+    ("outcome", np.int8),
+    ("base_reward", np.float32),
+    ("first_time_reward", np.float32),
+    ("new_pair_reward", np.float32),
+    ("completion_reward", np.float32),
+    ("penalty", np.float32),
+    ("reward", np.float32),
+])
+
+
+class EventRecorder:
+    """Ring buffer of per-step SchedulingEnv events.
+
+    Pass an instance as the env's event_hook. Events are written into a
+    preallocated structured array, so recording costs a single row assignment
+    and the last `capacity` steps can be dumped later for debugging.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.count = 0
+
+    def __call__(self, step, student, teacher, room, time_slot, outcome,
+                 base_reward, first_time_reward, new_pair_reward, completion_reward, penalty, reward):
+        self.buffer[self.count % self.capacity] = (
+            step, student, teacher, room, time_slot, outcome,
+            base_reward, first_time_reward, new_pair_reward, completion_reward, penalty, reward,
+        )
+        self.count += 1
+
+    def events(self):
+        """Recorded events, oldest first."""
+        if self.count <= self.capacity:
+            return self.buffer[:self.count].copy()
+        start = self.count % self.capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def clear(self):
+        self.count = 0
+
+    def dump(self, path):
+        """Write the recorded events to .npy, or to CSV for any other extension."""
+        events = self.events()
+        if str(path).endswith(".npy"):
+            np.save(path, events)
+            return
+
+        import pandas as pd
+        df = pd.DataFrame(events)
+        df["outcome"] = df["outcome"].map(OUTCOME_NAMES)
+        df.to_csv(path, index=False)
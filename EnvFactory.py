@@ -0,0 +1,115 @@
+import multiprocessing
+
+import numpy as np
+
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+
+from BatchedRLModel import BatchedSchedulingEnv
+from Curriculum import InstancePool
+from DataSchema import is_normalized, load_dataset, validate_dataset
+from RLModel import SchedulingEnv
+
+# Datasets registered in the parent process. Subprocess workers started with
+# "fork" inherit this dict copy-on-write, so the DataFrames are shared with
+# them instead of being pickled into every worker at spawn.
+_DATASETS = {}
+
+
+def register_dataset(name, teachers, students, rooms, times):
+    # Validate once here rather than in every worker's SchedulingEnv
+    if not is_normalized(teachers, students):
+        teachers, students, rooms, times = validate_dataset(teachers, students, rooms, times)
+    _DATASETS[name] = (teachers, students, rooms, times)
+
+
+class SchedulingEnvFactory:
+    """Picklable env constructor that looks its dataset up by name.
+
+    Only the name, the optional CSV paths and the env kwargs travel to the
+    worker. Under "spawn"/"forkserver" the registry starts empty, in which
+    case the worker loads the dataset from `paths` once and caches it.
+    """
+
+    def __init__(self, dataset_name, paths=None, env_kwargs=None):
+        self.dataset_name = dataset_name
+        self.paths = paths
+        self.env_kwargs = env_kwargs or {}
+
+    def __call__(self):
+        if self.dataset_name not in _DATASETS:
+            if self.paths is None:
+                raise RuntimeError(
+                    f"Dataset '{self.dataset_name}' is not registered in this process and no CSV paths were given"
+                )
+            register_dataset(self.dataset_name, *load_dataset(self.paths))
+
+        return SchedulingEnv(*_DATASETS[self.dataset_name], **self.env_kwargs)
+
+
+def make_scheduling_vec_env(teachers, students, rooms, times, n_envs=1, vectorization="subproc",
+                            seed=None, paths=None, env_kwargs=None, dataset_name="default"):
+    """Build a vectorized SchedulingEnv.
+
+    vectorization is "subproc" for one process per env, "dummy" to step all
+    envs in the current process or "batched" to simulate them together in a
+    single BatchedSchedulingEnv. Worker i is seeded with seed + i.
+    """
+    if vectorization not in ("subproc", "dummy", "batched"):
+        raise ValueError(f"Unknown vectorization '{vectorization}', expected 'subproc', 'dummy' or 'batched'")
+
+    if vectorization == "batched":
+        env = VecMonitor(BatchedSchedulingEnv(teachers, students, rooms, times, n_envs, **(env_kwargs or {})))
+        env.seed(seed)
+        return env
+
+    register_dataset(dataset_name, teachers, students, rooms, times)
+    factory = SchedulingEnvFactory(dataset_name, paths=paths, env_kwargs=env_kwargs)
+
+    if vectorization == "subproc" and n_envs > 1:
+        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        return make_vec_env(factory, n_envs=n_envs, seed=seed, vec_env_cls=SubprocVecEnv,
+                            vec_env_kwargs={"start_method": start_method})
+
+    return make_vec_env(factory, n_envs=n_envs, seed=seed, vec_env_cls=DummyVecEnv)
+
+
+class CurriculumEnvFactory:
+    """Picklable SchedulingEnv constructor whose envs draw a new InstancePool instance every reset.
+
+    Each worker builds its own pool from the same levels and seed, so they
+    share one reproducible set of instances but keep separate caches.
+    """
+
+    def __init__(self, levels, pool_kwargs=None, env_kwargs=None):
+        self.levels = levels
+        self.pool_kwargs = pool_kwargs or {}
+        self.env_kwargs = env_kwargs or {}
+
+    def __call__(self):
+        pool = InstancePool(self.levels, **self.pool_kwargs)
+        env_kwargs = dict(self.env_kwargs)
+        # Fixed spaces that fit the largest level
+        pad_to = env_kwargs.pop("pad_to", None)
+        if pad_to is None or isinstance(pad_to, str):
+            pad_to = pool.max_sizes
+        first = pool.sample(np.random.default_rng(pool.seed))
+        return SchedulingEnv(first.teachers, first.students, first.rooms, first.times, pad_to=pad_to,
+                             instance_sampler=pool, **env_kwargs)
+
+
+def make_curriculum_vec_env(levels, n_envs=1, vectorization="subproc", seed=None, pool_kwargs=None, env_kwargs=None):
+    """Vectorized SchedulingEnv over generated instances, see CurriculumEnvFactory.
+
+    Works with "subproc" and "dummy" vectorization; BatchedSchedulingEnv
+    simulates a single fixed instance.
+    """
+    if vectorization not in ("subproc", "dummy"):
+        raise ValueError(f"Curriculum training needs 'subproc' or 'dummy' vectorization, got '{vectorization}'")
+
+    factory = CurriculumEnvFactory(levels, pool_kwargs=pool_kwargs, env_kwargs=env_kwargs)
+    if vectorization == "subproc" and n_envs > 1:
+        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        return make_vec_env(factory, n_envs=n_envs, seed=seed, vec_env_cls=SubprocVecEnv,
+                            vec_env_kwargs={"start_method": start_method})
+    return make_vec_env(factory, n_envs=n_envs, seed=seed, vec_env_cls=DummyVecEnv)
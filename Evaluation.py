@@ -0,0 +1,208 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+from DataSchema import load_dataset
+from InferenceService import discover_instances
+from NumpyPolicy import NumpyPolicy, load_policy
+from RLModel import SchedulingEnv
+from Solvers import SOLVERS, SchedulingProblem
+
+# Per-process caches, so a worker loads each dataset and model once however
+# many episodes it runs
+_DATASETS = {}
+_AGENTS = {}
+
+
+def _dataset(instance):
+    name, source = instance
+    if name not in _DATASETS:
+        # Paths are loaded in the worker, DataFrames arrive ready to use
+        _DATASETS[name] = load_dataset(source) if isinstance(source[0], str) else source
+    return _DATASETS[name]
+
+
+def _agent(agent, use_masking):
+    if not isinstance(agent, str) or agent in SOLVERS:
+        return agent
+    if agent not in _AGENTS:
+        if not agent.endswith(".npz"):
+            # One torch thread per worker, the pool already uses every core
+            import torch
+            torch.set_num_threads(1)
+        _AGENTS[agent] = load_policy(agent, use_masking)
+    return _AGENTS[agent]
+
+
+def _run_solver(solver, dataset):
+    start = time.perf_counter()
+    state = SOLVERS[solver](SchedulingProblem(*dataset))
+    seconds = time.perf_counter() - start
+    return {
+        "coverage": state.coverage(),
+        "reward": np.nan,
+        "steps": state.num_scheduled,
+        "completed": state.num_scheduled == state.problem.num_students,
+        "seconds": seconds,
+    }, np.array([seconds * 1e6])
+
+
+def _run_policy(policy, dataset, seed, use_masking, deterministic, max_steps, pad_to):
+    env = SchedulingEnv(*dataset, max_steps=max_steps, pad_to=pad_to, copy_obs=False)
+    obs, _ = env.reset(seed=seed)
+    if isinstance(policy, NumpyPolicy):
+        policy.rng = np.random.default_rng(seed)
+    else:
+        from stable_baselines3.common.utils import set_random_seed
+        set_random_seed(seed)
+
+    clock = time.perf_counter
+    latencies = []
+    total_reward = 0.0
+    done = False
+    start = clock()
+    while not done:
+        step_start = clock()
+        if use_masking:
+            action, _ = policy.predict(obs, deterministic=deterministic, action_masks=env.action_masks())
+        else:
+            action, _ = policy.predict(obs, deterministic=deterministic)
+        obs, reward, done, _, _ = env.step(action)
+        latencies.append(clock() - step_start)
+        total_reward += reward
+    seconds = clock() - start
+
+    return {
+        "coverage": env.num_scheduled_students / len(env.student_ids),
+        "reward": total_reward,
+        "steps": env.steps,
+        "completed": env.num_scheduled_students == len(env.student_ids),
+        "seconds": seconds,
+    }, np.array(latencies) * 1e6
+
+
+def run_episode(task):
+    """One evaluation episode; task is (agent name, agent, instance, seed, options)."""
+    agent_name, agent, instance, seed, options = task
+    dataset = _dataset(instance)
+    agent = _agent(agent, options["use_masking"])
+    if isinstance(agent, str):
+        result, latencies = _run_solver(agent, dataset)
+    else:
+        result, latencies = _run_policy(agent, dataset, seed, **options)
+    result.update({"agent": agent_name, "instance": instance[0], "seed": seed})
+    return result, latencies
+
+
+def _agent_name(agent):
+    return agent if agent in SOLVERS else os.path.basename(str(agent))
+
+
+def summarize(episodes, latencies, by=("agent",)):
+    """Aggregate episode rows (and their per-step latencies in us) into one row per `by` group."""
+    by = list(by)
+    grouped = episodes.groupby(by, sort=False)
+    summary = grouped.agg(
+        episodes=("coverage", "size"),
+        coverage_mean=("coverage", "mean"),
+        coverage_std=("coverage", "std"),
+        reward_mean=("reward", "mean"),
+        completion_rate=("completed", "mean"),
+        steps_mean=("steps", "mean"),
+    )
+    # Steps-to-completion only over episodes that scheduled everyone
+    summary["steps_to_completion_mean"] = episodes[episodes["completed"]].groupby(by, sort=False)["steps"].mean()
+    for q in (50, 90, 99):
+        summary[f"episode_seconds_p{q}"] = grouped["seconds"].quantile(q / 100)
+
+    # Percentiles over every step of the group's episodes pooled together
+    step_latency = pd.Series(latencies, index=episodes.index).groupby([episodes[column] for column in by], sort=False)
+    for q in (50, 99):
+        summary[f"step_latency_p{q}_us"] = step_latency.agg(
+            lambda rows: np.percentile(np.concatenate(rows.tolist()), q))
+    return summary.reset_index()
+
+
+def evaluate(agents, instances, episodes=5, workers=None, seed=0, use_masking=config.USE_ACTION_MASKING,
+             deterministic=False, max_steps=1000, pad_to=config.PAD_TO, executor=None):
+    """Roll every agent out on every instance and return (episode table, summary table).
+
+    agents are solver names ("greedy", "exact"), model paths for
+    load_policy (SB3 .zip or NumpyPolicy .npz) or {name: agent} with
+    NumpyPolicy objects among the values. instances maps a name to dataset
+    paths (as from InferenceService.discover_instances) or to the
+    DataFrames themselves.
+
+    Episode i of every instance uses seed + i for the env and the policy's
+    sampling, so agents are compared on the same draws and reruns repeat
+    exactly. Episodes are spread over a process pool of `workers`
+    processes (0 runs them in this process), or over `executor` if given.
+    Solvers are deterministic and run once per instance.
+    """
+    if not isinstance(agents, dict):
+        agents = {_agent_name(agent): agent for agent in agents}
+    options = {"use_masking": use_masking, "deterministic": deterministic, "max_steps": max_steps,
+               "pad_to": pad_to}
+    tasks = [
+        (name, agent, instance, seed + episode, options)
+        for name, agent in agents.items()
+        for instance in instances.items()
+        for episode in range(1 if isinstance(agent, str) and agent in SOLVERS else episodes)
+    ]
+
+    if executor is not None:
+        results = list(executor.map(run_episode, tasks))
+    elif workers == 0:
+        results = [run_episode(task) for task in tasks]
+    else:
+        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(start_method)) as pool:
+            results = list(pool.map(run_episode, tasks))
+
+    table = pd.DataFrame([result for result, _ in results])
+    latencies = [latency for _, latency in results]
+    return table, summarize(table, latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare trained models and solvers over many test instances.")
+    parser.add_argument("agents", nargs="+", help="model paths (.zip or .npz) and/or solver names "
+                                                  f"({', '.join(sorted(SOLVERS))})")
+    parser.add_argument("--instances", help="directory whose subdirectories each hold one dataset "
+                                            "(default: the *_test.csv dataset in this directory)")
+    parser.add_argument("--episodes", type=int, default=10, help="seeded rollouts per instance")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deterministic", action="store_true")
+    parser.add_argument("--masking", action="store_true", default=config.USE_ACTION_MASKING)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--output", default="evaluation_results.csv", help="summary table")
+    parser.add_argument("--episodes-output", default="evaluation_episodes.csv", help="per-episode table")
+    args = parser.parse_args(argv)
+
+    if args.instances:
+        instances = discover_instances(args.instances)
+    else:
+        instances = {"test": tuple(f"{name}_test.csv" for name in ("teachers", "students", "rooms", "times"))}
+
+    start = time.perf_counter()
+    episodes, summary = evaluate(args.agents, instances, args.episodes, args.workers, args.seed, args.masking,
+                                 args.deterministic, args.max_steps)
+    elapsed = time.perf_counter() - start
+
+    episodes.to_csv(args.episodes_output, index=False)
+    summary.to_csv(args.output, index=False)
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(summary)
+    print(f"{len(episodes)} episodes over {len(instances)} instance(s) in {elapsed:.1f}s, "
+          f"results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
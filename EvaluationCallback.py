@@ -0,0 +1,82 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+import config
+from Evaluation import evaluate
+from NumpyPolicy import NumpyPolicy, policy_arrays
+
+
+class AsyncEvalCallback(BaseCallback):
+    """Evaluates the policy being trained every `eval_freq` timesteps without stalling training.
+
+    The policy is snapshotted as a NumpyPolicy (a copy of the weights, no
+    torch needed to run it) and evaluate() runs on a background thread,
+    fanning the episodes out over a process pool that is kept for the whole
+    run. Training continues meanwhile; finished results are recorded to the
+    SB3 logger under eval/ and kept in self.results. If an evaluation is
+    still running when the next one is due, the new one is skipped.
+    """
+
+    def __init__(self, instances, eval_freq=20000, episodes=5, workers=2, seed=0, deterministic=False,
+                 use_masking=config.USE_ACTION_MASKING, max_steps=1000, verbose=1):
+        super(AsyncEvalCallback, self).__init__(verbose)
+        self.instances = instances
+        self.eval_freq = eval_freq
+        self.eval_kwargs = {"episodes": episodes, "seed": seed, "deterministic": deterministic,
+                            "use_masking": use_masking, "max_steps": max_steps}
+        self.workers = workers
+        self.results = []
+        self._next_eval = None
+        self._thread = None
+        self._pool = None
+        self._pending = None
+        self._pad_to = None
+
+    def _on_training_start(self):
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eval")
+        if self.workers:
+            # spawn rather than fork: the training process has torch threads running
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._next_eval = (self.num_timesteps // self.eval_freq + 1) * self.eval_freq
+        # Evaluation envs need the spaces the policy was built for: the action
+        # sizes are the padded teachers, rooms and slots, and the observation
+        # holds 2 * teachers + students entries
+        teachers, rooms, slots = (int(n) for n in self.model.action_space.nvec)
+        self._pad_to = (teachers, self.model.observation_space.shape[0] - 2 * teachers, rooms, slots)
+
+    def _on_step(self) -> bool:
+        if self._pending is not None and self._pending.done():
+            self._record()
+        if self.num_timesteps >= self._next_eval:
+            self._next_eval = (self.num_timesteps // self.eval_freq + 1) * self.eval_freq
+            if self._pending is None:
+                snapshot = NumpyPolicy.from_arrays(policy_arrays(self.model))
+                self._pending = self._thread.submit(self._evaluate, self.num_timesteps, snapshot)
+            elif self.verbose >= 1:
+                print(f"Evaluation still running, skipping the one due at {self.num_timesteps} timesteps")
+        return True
+
+    def _evaluate(self, timesteps, policy):
+        _, summary = evaluate({"policy": policy}, self.instances, workers=0, executor=self._pool,
+                              pad_to=self._pad_to, **self.eval_kwargs)
+        return timesteps, summary.iloc[0].to_dict()
+
+    def _record(self):
+        pending, self._pending = self._pending, None
+        timesteps, row = pending.result()
+        self.results.append({"timesteps": timesteps, **row})
+        for name in ("coverage_mean", "reward_mean", "completion_rate", "steps_to_completion_mean",
+                     "step_latency_p50_us"):
+            self.logger.record(f"eval/{name}", row[name])
+        if self.verbose >= 1:
+            print(f"Eval at {timesteps} timesteps: coverage {row['coverage_mean']:.1%}, "
+                  f"reward {row['reward_mean']:.2f}, completion {row['completion_rate']:.0%}")
+
+    def _on_training_end(self):
+        if self._pending is not None:
+            self._record()
+        self._thread.shutdown()
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -1,16 +1,77 @@
-﻿import pandas as pd
+﻿import multiprocessing
+
+import numpy as np
 import optuna
-from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
-from RLModel import SchedulingEnv
+from optuna.storages.journal import JournalFileBackend, JournalStorage
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from stable_baselines3.common.callbacks import BaseCallback, CallbackList
+from config import USE_ACTION_MASKING, PAD_TO, RESUME_TRAINING, CHECKPOINT_DIR, CHECKPOINT_FREQ, TOTAL_TIMESTEPS
+from Checkpointing import AsyncCheckpointCallback, clear_checkpoints, restore_checkpoint, save_model_atomic
+from DataSchema import load_dataset
+from EnvFactory import make_scheduling_vec_env
+from RLModel import get_algorithm
 from TrainingLogger import TrainingLoggerCallback
 
+STUDY_NAME = "scheduling_ppo"
+STORAGE_PATH = "hyper_paramater_study.log"
+TRIAL_TIMESTEPS = 50000
+EVAL_FREQ = 5000
+
 
 # Load datasets globally to avoid reloading in each trial
-teachers = pd.read_csv("teachers.csv")
-students = pd.read_csv("students.csv")
-rooms = pd.read_csv("rooms.csv")
-times = pd.read_csv("times.csv")
+teachers, students, rooms, times = load_dataset(("teachers.csv", "students.csv", "rooms.csv", "times.csv"))
+
+
+def compute_score(summary):
+    final_reward = summary["reward_mean"]
+    final_entropy = summary["entropy_loss"]
+    final_explained_variance = summary["explained_variance"]
+    value_loss_std = summary["value_loss_std"]  # Lower is better
+    policy_loss_std = summary["policy_loss_std"]  # Lower is better
+
+    # Weighted score (maximize reward, minimize entropy loss & variance)
+    score = (
+            final_reward  # Maximize reward
+            - abs(final_entropy) * 10  # Push entropy loss closer to 0
+            - value_loss_std * 5  # Reduce value loss variance
+            - policy_loss_std * 5  # Reduce policy loss variance
+            + final_explained_variance * 10  # Improve explained variance
+    )
+
+    return score  # Optuna will maximize this value
+
+
+class TrialPruningCallback(BaseCallback):
+    """Reports the running score to Optuna and stops training if the trial is pruned.
+
+    The score is computed from the running summary of the trial's own
+    TrainingLoggerCallback, so concurrent trials never share a file.
+    """
+
+    def __init__(self, trial, log_callback, eval_freq=EVAL_FREQ, verbose=0):
+        super(TrialPruningCallback, self).__init__(verbose)
+        self.trial = trial
+        self.log_callback = log_callback
+        self.eval_freq = eval_freq
+        self.pruned = False
+        self.last_score = np.nan
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.eval_freq != 0:
+            return True
+
+        self.last_score = compute_score(self.log_callback.summary())
+        # No PPO update has happened yet, the losses are still NaN
+        if not np.isfinite(self.last_score):
+            return True
+
+        self.trial.report(self.last_score, self.num_timesteps)
+        if self.trial.should_prune():
+            self.pruned = True
+            return False
+        return True
+
 
 # Define the objective function for Bayesian Optimization
 def objective(trial):
@@ -20,12 +81,13 @@ def objective(trial):
     clip_range = trial.suggest_float("clip_range", 0.1, 0.9)  # Updated from suggest_uniform
     ent_coef = trial.suggest_float("ent_coef", 1e-4, 0.1, log=True)  # Updated from suggest_loguniform
 
-    print("Setting up model...")
-    env = make_vec_env(lambda: SchedulingEnv(teachers, students, rooms, times), n_envs=1)
+    env = make_scheduling_vec_env(teachers, students, rooms, times, n_envs=1, vectorization="dummy",
+                                  seed=trial.number, env_kwargs={"pad_to": PAD_TO})
 
-    model = PPO(
+    algorithm = get_algorithm(USE_ACTION_MASKING)
+    model = algorithm(
         "MlpPolicy", env,
-        verbose=1,
+        verbose=0,
         device="auto",
         learning_rate=learning_rate,
         gamma=gamma,
@@ -35,48 +97,98 @@ def objective(trial):
         batch_size=2048
     )
 
-    # Train for a small number of timesteps to evaluate performance
-    log_callback = TrainingLoggerCallback(log_dir="hyper_paramater_training_logs.csv")
-    model.learn(total_timesteps=50000, callback=log_callback)
+    # Train for a small number of timesteps to evaluate performance, each
+    # trial keeps its metrics in memory and writes its own log file
+    log_callback = TrainingLoggerCallback(log_dir=f"hyper_paramater_training_logs_trial_{trial.number}.arrow",
+                                          verbose=0, log_interval=10)
+    pruning_callback = TrialPruningCallback(trial, log_callback)
+    model.learn(total_timesteps=TRIAL_TIMESTEPS, callback=CallbackList([log_callback, pruning_callback]))
+
+    if pruning_callback.pruned:
+        raise optuna.TrialPruned()
 
     # Evaluate model performance
-    logs = pd.read_csv("hyper_paramater_training_logs.csv")
-    final_reward = logs["reward_mean"].iloc[-1]
-    final_entropy = logs["entropy_loss"].iloc[-1]
-    final_explained_variance = logs["explained_variance"].iloc[-1]
-    value_loss_std = logs["value_loss"].std()  # Lower is better
-    policy_loss_std = logs["policy_loss"].std()  # Lower is better
+    return compute_score(log_callback.summary())
 
-    # Weighted score (maximize reward, minimize entropy loss & variance)
-    score = (
-            final_reward  # Maximize reward
-            - abs(final_entropy) * 10  # Push entropy loss closer to 0
-            - value_loss_std * 5  # Reduce value loss variance
-            - policy_loss_std * 5  # Reduce policy loss variance
-            + final_explained_variance * 10  # Improve explained variance
-    )
 
-    return score  # Optuna will maximize this value
+def get_storage(storage_path=STORAGE_PATH):
+    # Journal file storage is safe for concurrent processes and lets a study be resumed
+    return JournalStorage(JournalFileBackend(storage_path))
+
 
-def main():
-    # Optimize hyperparameters
-    study = optuna.create_study(direction="maximize")  # Maximize reward
-    study.optimize(objective, n_trials=20)  # Run 20 trials
+def get_pruner(name):
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=EVAL_FREQ, max_resource=TRIAL_TIMESTEPS)
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=EVAL_FREQ * 2)
+    raise ValueError(f"Unknown pruner '{name}', expected 'median' or 'hyperband'")
+
+
+def run_worker(study_name, storage_path, n_trials, pruner="median"):
+    # One torch thread per worker so parallel trials don't oversubscribe the CPU
+    import torch
+    torch.set_num_threads(1)
+
+    # The pruner is not kept in the storage, load_study would fall back to
+    # Optuna's default MedianPruner without it
+    study = optuna.load_study(study_name=study_name, storage=get_storage(storage_path), pruner=get_pruner(pruner))
+    # Stop once the whole study, across all workers, has n_trials finished trials
+    study.optimize(objective, callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))])
+
+
+def main(n_trials=100, n_jobs=None, pruner="median", study_name=STUDY_NAME, storage_path=STORAGE_PATH,
+         resume=RESUME_TRAINING):
+    n_jobs = n_jobs or multiprocessing.cpu_count()
+
+    # Optimize hyperparameters, resuming the study if it already exists
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=get_storage(storage_path),
+        direction="maximize",  # Maximize reward
+        pruner=get_pruner(pruner),
+        load_if_exists=True,
+    )
+
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(study_name, storage_path, n_trials, pruner))
+        for _ in range(n_jobs)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
 
     # Get best hyperparameters
+    study = optuna.load_study(study_name=study_name, storage=get_storage(storage_path))
+    pruned = len(study.get_trials(deepcopy=False, states=(TrialState.PRUNED,)))
+    print(f"Finished {len(study.trials)} trials ({pruned} pruned)")
     best_params = study.best_params
     print("Best hyperparameters found:", best_params)
 
     # Train final model with optimal hyperparameters
-    env = SchedulingEnv(teachers, students, rooms, times)
-
-    model = PPO("MultiInputPolicy", env, verbose=1, device="auto", **best_params)
-
-    log_callback = TrainingLoggerCallback(log_dir="hyper_paramater_training_logs.csv")
-    model.learn(total_timesteps=100000, callback=log_callback)
-
-    # Save final model
-    model.save("scheduling_rl_model")
+    env = make_scheduling_vec_env(teachers, students, rooms, times, n_envs=1, vectorization="dummy",
+                                  env_kwargs={"pad_to": PAD_TO})
+
+    # The final retrain checkpoints into its own directory and, with resume,
+    # continues an interrupted retrain from it
+    checkpoint_dir = f"{CHECKPOINT_DIR}/{study_name}_final"
+    log_callback = TrainingLoggerCallback(log_dir="hyper_paramater_training_logs.arrow", log_interval=10)
+    algorithm = get_algorithm(USE_ACTION_MASKING)
+    model = None
+    if resume:
+        model = restore_checkpoint(algorithm, env, checkpoint_dir, logger_callback=log_callback, device="auto")
+    else:
+        clear_checkpoints(checkpoint_dir)
+    if model is None:
+        model = algorithm("MlpPolicy", env, verbose=1, device="auto", **best_params)
+    checkpoint_callback = AsyncCheckpointCallback(checkpoint_dir, CHECKPOINT_FREQ, logger_callback=log_callback)
+
+    model.learn(total_timesteps=TOTAL_TIMESTEPS - model.num_timesteps, callback=[log_callback, checkpoint_callback],
+                reset_num_timesteps=False)
+
+    # Save final model; the retrain is complete, so later studies start it afresh
+    save_model_atomic(model, "scheduling_rl_model")
+    clear_checkpoints(checkpoint_dir)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,153 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import config
+from DataSchema import DATASET_NAMES, load_dataset, save_schedule
+from NumpyPolicy import load_policy
+from RLModel import SchedulingEnv
+
+
+def discover_instances(root):
+    """Map instance name -> table paths for every directory under root holding a dataset.
+
+    An instance directory contains teachers/students/rooms/times as .csv
+    and/or .parquet files, as written by DatasetGenerator --out-dir.
+    """
+    instances = {}
+    for dirpath, _, filenames in os.walk(root):
+        stems = {os.path.splitext(name)[0] for name in filenames}
+        if all(name in stems for name in DATASET_NAMES):
+            name = os.path.relpath(dirpath, root).replace(os.sep, "_")
+            instances["root" if name == "." else name] = tuple(
+                os.path.join(dirpath, f"{table}.csv") for table in DATASET_NAMES
+            )
+    return dict(sorted(instances.items()))
+
+
+class BatchedScheduler:
+    """Runs a trained policy over many SchedulingEnv instances in lockstep.
+
+    Up to batch_size instances are active at once; their observations (and
+    action masks) are stacked so each step is a single forward pass through
+    the policy. Every env is capped at max_steps, and as soon as an instance
+    finishes its schedule is written out and the next pending instance takes
+    its place in the batch.
+    """
+
+    def __init__(self, model, use_masking=False, deterministic=False, max_steps=1000, pad_to=config.PAD_TO,
+                 batch_size=64):
+        self.model = model
+        self.use_masking = use_masking
+        self.deterministic = deterministic
+        self.max_steps = max_steps
+        self.pad_to = pad_to
+        self.batch_size = batch_size
+
+    @classmethod
+    def load(cls, model_path=config.INFERENCE_MODEL, use_masking=config.USE_ACTION_MASKING, **kwargs):
+        return cls(load_policy(model_path, use_masking), use_masking=use_masking, **kwargs)
+
+    def make_env(self, dataset):
+        # Observations are stacked before the next step, so the env's buffer
+        # can be handed out without a copy
+        return SchedulingEnv(*dataset, max_steps=self.max_steps, pad_to=self.pad_to, copy_obs=False)
+
+    def run(self, instances, on_finished=None):
+        """Schedule every (name, dataset) pair and return one result dict per instance.
+
+        on_finished(name, schedule, result) is called as each instance completes.
+        """
+        pending = iter(instances)
+        active = []  # [name, env, obs, start time]
+        results = []
+        start = time.perf_counter()
+
+        def refill():
+            while len(active) < self.batch_size:
+                try:
+                    name, dataset = next(pending)
+                except StopIteration:
+                    return
+                env = self.make_env(dataset)
+                obs, _ = env.reset()
+                active.append([name, env, obs, time.perf_counter()])
+
+        refill()
+        while active:
+            obs = np.stack([entry[2] for entry in active])
+            if self.use_masking:
+                masks = np.stack([entry[1].action_masks() for entry in active])
+                actions, _ = self.model.predict(obs, deterministic=self.deterministic, action_masks=masks)
+            else:
+                actions, _ = self.model.predict(obs, deterministic=self.deterministic)
+
+            still_active = []
+            for entry, action in zip(active, actions):
+                name, env = entry[0], entry[1]
+                entry[2], _, done, truncated, _ = env.step(action)
+                # The env's own max_steps already ends the episode; the step
+                # count check is a hard stop should that ever change.
+                if done or truncated or env.steps >= self.max_steps:
+                    result = {
+                        "instance": name,
+                        "lessons": len(env.schedule),
+                        "students": len(env.student_ids),
+                        "coverage": env.num_scheduled_students / len(env.student_ids),
+                        "steps": env.steps,
+                        "seconds": time.perf_counter() - entry[3],
+                    }
+                    results.append(result)
+                    if on_finished is not None:
+                        on_finished(name, env.schedule, result)
+                else:
+                    still_active.append(entry)
+            active[:] = still_active
+            refill()
+
+        elapsed = time.perf_counter() - start
+        for result in results:
+            result["schedules_per_sec"] = len(results) / elapsed if elapsed > 0 else float("inf")
+        return results
+
+
+def schedule_directory(instances_dir, output_dir="schedules", model_path=config.INFERENCE_MODEL,
+                       use_masking=config.USE_ACTION_MASKING, **scheduler_kwargs):
+    """Schedule every instance under instances_dir and stream <name>_schedule.csv files to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    scheduler = BatchedScheduler.load(model_path, use_masking=use_masking, **scheduler_kwargs)
+    instance_paths = discover_instances(instances_dir)
+
+    def write_schedule(name, schedule, result):
+        save_schedule(schedule, os.path.join(output_dir, f"{name}_schedule.csv"))
+        print(f"{name}: {result['coverage']:.1%} coverage in {result['steps']} steps")
+
+    # Datasets are loaded lazily as slots in the batch free up
+    instances = ((name, load_dataset(paths)) for name, paths in instance_paths.items())
+    start = time.perf_counter()
+    results = scheduler.run(instances, on_finished=write_schedule)
+    elapsed = time.perf_counter() - start
+
+    print(f"Scheduled {len(results)} instances in {elapsed:.2f}s ({len(results) / elapsed:,.1f} schedules/s)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule many instances with a trained policy in one process.")
+    parser.add_argument("instances_dir", help="directory whose subdirectories each hold one dataset")
+    parser.add_argument("--model", default=config.INFERENCE_MODEL, help="SB3 model, or a .npz NumpyPolicy export")
+    parser.add_argument("--output-dir", default="schedules")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--deterministic", action="store_true")
+    parser.add_argument("--masking", action="store_true", default=config.USE_ACTION_MASKING)
+    args = parser.parse_args(argv)
+
+    schedule_directory(args.instances_dir, args.output_dir, args.model, use_masking=args.masking,
+                       deterministic=args.deterministic, max_steps=args.max_steps, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import time
+
+import numpy as np
+
+from DataSchema import load_dataset, load_schedule, save_schedule
+from Solvers import OccupancyState, SchedulingProblem
+
+
+def _square_delta(load_from, load_to):
+    """Change in sum(load ** 2) when one lesson moves from a load_from to a load_to bucket."""
+    return 2 * (load_to - load_from) + 2
+
+
+class LocalSearch:
+    """Incremental local search over an OccupancyState.
+
+    The objective rewards coverage and penalises uneven teacher and room
+    loads:
+
+        coverage_weight * scheduled - teacher_weight * sum(teacher_load ** 2)
+                                    - room_weight * sum(room_load ** 2)
+
+    Every move is scored from the load counters, so a delta costs O(1); an
+    ejection chain is scored once tried and undone if it loses. The search
+    also keeps each teacher's count of free slots and an array of scheduled
+    students, so picking a lesson is O(1) and no move scans the full teacher x
+    slot grid. Moves are: insert an unscheduled student, insert one by
+    ejecting a blocking lesson to another teacher/slot, move a lesson to
+    another compatible teacher, move a lesson to another room, and move a
+    lesson to another slot. Only non-worsening moves are accepted, insertions
+    included, so the objective never goes down; accepting equal moves lets the
+    search walk plateaus and open up space for later insertions.
+    """
+
+    def __init__(self, problem, state, coverage_weight=1000.0, teacher_weight=1.0, room_weight=0.1, seed=0):
+        self.problem = problem
+        self.state = state
+        self.coverage_weight = coverage_weight
+        self.teacher_weight = teacher_weight
+        self.room_weight = room_weight
+        self.rng = np.random.default_rng(seed)
+        self.moves_tried = 0
+        self.moves_accepted = 0
+
+        # free_slots[t] = slots teacher t is neither teaching nor blocked in
+        self.free_slots = (~state.teacher_busy).sum(axis=1)
+        # scheduled[:num_lessons] lists the scheduled students, position[s] is s's index in it
+        self.scheduled = np.flatnonzero(state.lesson_of[:, 0] >= 0)
+        self.num_lessons = len(self.scheduled)
+        self.scheduled = np.concatenate((self.scheduled, np.zeros(problem.num_students - self.num_lessons, np.int64)))
+        self.position = np.full(problem.num_students, -1, dtype=np.int64)
+        self.position[self.scheduled[:self.num_lessons]] = np.arange(self.num_lessons)
+
+    def objective(self):
+        state = self.state
+        return (
+            self.coverage_weight * state.num_scheduled
+            - self.teacher_weight * float(np.sum(state.teacher_load ** 2))
+            - self.room_weight * float(np.sum(state.room_load ** 2))
+        )
+
+    def _place(self, teacher_idx, student_idx, room_idx, time_slot):
+        self.state.place(teacher_idx, student_idx, room_idx, time_slot)
+        self.free_slots[teacher_idx] -= 1
+        self.scheduled[self.num_lessons] = student_idx
+        self.position[student_idx] = self.num_lessons
+        self.num_lessons += 1
+
+    def _remove(self, student_idx):
+        teacher_idx, room_idx, time_slot = self.state.remove(student_idx)
+        self.free_slots[teacher_idx] += 1
+        # Swap the last scheduled student into the removed one's position
+        self.num_lessons -= 1
+        last = self.scheduled[self.num_lessons]
+        self.scheduled[self.position[student_idx]] = last
+        self.position[last] = self.position[student_idx]
+        self.position[student_idx] = -1
+        return teacher_idx, room_idx, time_slot
+
+    def _least_loaded_free_room(self, time_slot):
+        state = self.state
+        if state.room_free_count[time_slot] == 0:
+            return -1
+        return int(np.argmin(np.where(state.room_busy[:, time_slot], np.iinfo(np.int64).max, state.room_load)))
+
+    def _under_capacity(self):
+        return self.state.teacher_load < self.problem.teacher_capacity
+
+    def _insert_delta(self, teacher_idx, room_idx):
+        """Objective change from one more lesson with teacher_idx in room_idx."""
+        state = self.state
+        return (self.coverage_weight - self.teacher_weight * (2 * state.teacher_load[teacher_idx] + 1)
+                - self.room_weight * (2 * state.room_load[room_idx] + 1))
+
+    def _loads_delta(self, teacher_changes, room_changes):
+        """Objective change in the load penalties, given the loads after a move and each entity's net change."""
+        state = self.state
+        teacher_delta = sum(int(state.teacher_load[t]) ** 2 - int(state.teacher_load[t] - change) ** 2
+                            for t, change in teacher_changes.items())
+        room_delta = sum(int(state.room_load[r]) ** 2 - int(state.room_load[r] - change) ** 2
+                         for r, change in room_changes.items())
+        return -self.teacher_weight * teacher_delta - self.room_weight * room_delta
+
+    def try_insert(self, student_idx, exclude=None, scored=True):
+        """Place an unscheduled student with the least loaded compatible teacher that has room.
+
+        Teachers are tried from the least loaded up and only the chosen
+        teacher's slots are scanned; one is passed over only when every slot
+        they are free in has all its rooms taken. The insertion is skipped if
+        it would lower the objective, unless scored is False (the caller
+        scores the move it is part of).
+        """
+        state = self.state
+        rooms_open = state.room_free_count > 0
+        if not rooms_open.any():
+            return False
+        masked_load = np.iinfo(np.int64).max
+        candidates = self.problem.tables.compatible[student_idx] & (self.free_slots > 0) & self._under_capacity()
+        loads = np.where(candidates, state.teacher_load, masked_load)
+
+        while True:
+            teacher_idx = int(np.argmin(loads))
+            if loads[teacher_idx] == masked_load:
+                return False
+            open_slots = ~state.teacher_busy[teacher_idx] & rooms_open
+            if exclude is not None and exclude[0] == teacher_idx:
+                open_slots[exclude[1]] = False
+            if open_slots.any():
+                time_slot = int(np.argmax(open_slots))
+                room_idx = self._least_loaded_free_room(time_slot)
+                if scored and self._insert_delta(teacher_idx, room_idx) < 0:
+                    return False
+                self._place(teacher_idx, student_idx, room_idx, time_slot)
+                return True
+            loads[teacher_idx] = masked_load
+
+    def try_eject_insert(self, student_idx):
+        """Free a compatible teacher's slot by moving its lesson elsewhere, then take it.
+
+        Kept only if the whole chain (the moved lesson plus the new one) does
+        not lower the objective.
+        """
+        state = self.state
+        teachers = np.flatnonzero(self.problem.tables.compatible[student_idx])
+        if len(teachers) == 0:
+            return False
+        teacher_idx = int(self.rng.choice(teachers))
+        # Slots with a lesson; blocked slots without one cannot be freed
+        busy_slots = np.flatnonzero(state.occupant[teacher_idx] >= 0)
+        if len(busy_slots) == 0:
+            return False
+        time_slot = int(self.rng.choice(busy_slots))
+
+        blocking = int(state.occupant[teacher_idx, time_slot])
+        _, room_idx, _ = self._remove(blocking)
+        # The blocking lesson must land somewhere other than the spot it frees
+        if not self.try_insert(blocking, exclude=(teacher_idx, time_slot), scored=False):
+            self._place(teacher_idx, blocking, room_idx, time_slot)
+            return False
+        # It may have taken the freed room in the same slot under another
+        # teacher, or the teacher's last unit of workload in another slot
+        free_room = room_idx if not state.room_busy[room_idx, time_slot] else \
+            self._least_loaded_free_room(time_slot)
+        if free_room < 0 or state.teacher_load[teacher_idx] >= self.problem.teacher_capacity[teacher_idx]:
+            self._remove(blocking)
+            self._place(teacher_idx, blocking, room_idx, time_slot)
+            return False
+        self._place(teacher_idx, student_idx, free_room, time_slot)
+
+        # Net load changes: teacher_idx swaps one lesson for another, the
+        # moved lesson adds one to its new teacher and room
+        moved_teacher, moved_room, _ = (int(v) for v in state.lesson_of[blocking])
+        teacher_changes = {teacher_idx: 0}
+        teacher_changes[moved_teacher] = teacher_changes.get(moved_teacher, 0) + 1
+        room_changes = {room_idx: -1}
+        for room in (moved_room, free_room):
+            room_changes[room] = room_changes.get(room, 0) + 1
+        if self.coverage_weight + self._loads_delta(teacher_changes, room_changes) < 0:
+            self._remove(student_idx)
+            self._remove(blocking)
+            self._place(teacher_idx, blocking, room_idx, time_slot)
+            return False
+        return True
+
+    def _random_lesson(self):
+        if self.num_lessons == 0:
+            return None
+        student_idx = int(self.scheduled[self.rng.integers(self.num_lessons)])
+        return (student_idx,) + tuple(int(v) for v in self.state.lesson_of[student_idx])
+
+    def move_teacher(self):
+        lesson = self._random_lesson()
+        if lesson is None:
+            return False
+        student_idx, teacher_idx, room_idx, time_slot = lesson
+        state = self.state
+        candidates = self.problem.tables.compatible[student_idx] & ~state.teacher_busy[:, time_slot] & \
+            self._under_capacity()
+        if not candidates.any():
+            return False
+        target = int(np.argmin(np.where(candidates, state.teacher_load, np.iinfo(np.int64).max)))
+        delta = -self.teacher_weight * _square_delta(state.teacher_load[teacher_idx], state.teacher_load[target])
+        if delta < 0:
+            return False
+        self._remove(student_idx)
+        self._place(target, student_idx, room_idx, time_slot)
+        return True
+
+    def move_room(self):
+        lesson = self._random_lesson()
+        if lesson is None:
+            return False
+        student_idx, teacher_idx, room_idx, time_slot = lesson
+        state = self.state
+        target = self._least_loaded_free_room(time_slot)
+        if target < 0:
+            return False
+        delta = -self.room_weight * _square_delta(state.room_load[room_idx], state.room_load[target])
+        if delta < 0:
+            return False
+        self._remove(student_idx)
+        self._place(teacher_idx, student_idx, target, time_slot)
+        return True
+
+    def move_slot(self):
+        lesson = self._random_lesson()
+        if lesson is None:
+            return False
+        student_idx, teacher_idx, room_idx, _ = lesson
+        state = self.state
+        free_slots = np.flatnonzero(~state.teacher_busy[teacher_idx] & (state.room_free_count > 0))
+        if len(free_slots) == 0:
+            return False
+        target_slot = int(self.rng.choice(free_slots))
+        # Keep the room if it is free in the new slot, which leaves the objective unchanged
+        target_room = room_idx if not state.room_busy[room_idx, target_slot] else \
+            self._least_loaded_free_room(target_slot)
+        delta = 0.0 if target_room == room_idx else \
+            -self.room_weight * _square_delta(state.room_load[room_idx], state.room_load[target_room])
+        if delta < 0:
+            return False
+        self._remove(student_idx)
+        self._place(teacher_idx, student_idx, target_room, target_slot)
+        return True
+
+    def run(self, time_budget=1.0, max_moves=None):
+        """Improve the state in place until the time budget or move limit runs out."""
+        clock = time.perf_counter
+        deadline = clock() + time_budget
+        unscheduled = [int(s) for s in np.flatnonzero(self.state.lesson_of[:, 0] < 0)]
+
+        # Direct insertions first, cheapest way to gain coverage; students
+        # not reached before the deadline stay unscheduled
+        remaining = []
+        for position, student_idx in enumerate(unscheduled):
+            if clock() >= deadline:
+                remaining.extend(unscheduled[position:])
+                break
+            if not self.try_insert(student_idx):
+                remaining.append(student_idx)
+        unscheduled = remaining
+
+        moves = (self.move_teacher, self.move_room, self.move_slot)
+        while clock() < deadline and (max_moves is None or self.moves_tried < max_moves):
+            self.moves_tried += 1
+            if unscheduled and self.rng.random() < 0.5:
+                position = int(self.rng.integers(len(unscheduled)))
+                student_idx = unscheduled[position]
+                if self.try_insert(student_idx) or self.try_eject_insert(student_idx):
+                    unscheduled[position] = unscheduled[-1]
+                    unscheduled.pop()
+                    self.moves_accepted += 1
+            elif moves[int(self.rng.integers(len(moves)))]():
+                self.moves_accepted += 1
+
+        return self.state
+
+
+def repair_schedule(problem, schedule, time_budget=1.0, seed=0, **weights):
+    """Run local search on a partial schedule and return (repaired schedule, report)."""
+    state = OccupancyState.from_schedule(problem, schedule)
+    search = LocalSearch(problem, state, seed=seed, **weights)
+
+    initial_coverage = state.coverage()
+    initial_objective = search.objective()
+    start = time.perf_counter()
+    search.run(time_budget)
+
+    report = {
+        "initial_coverage": initial_coverage,
+        "final_coverage": state.coverage(),
+        "initial_objective": initial_objective,
+        "final_objective": search.objective(),
+        "moves_tried": search.moves_tried,
+        "moves_accepted": search.moves_accepted,
+        "seconds": time.perf_counter() - start,
+    }
+    return state.to_schedule(), report
+
+
+def print_report(report):
+    print(f"Coverage: {report['initial_coverage']:.1%} -> {report['final_coverage']:.1%}")
+    print(f"Objective: {report['initial_objective']:,.1f} -> {report['final_objective']:,.1f} "
+          f"({report['moves_accepted']} / {report['moves_tried']} moves accepted in {report['seconds']:.2f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repair and improve a schedule with local search.")
+    parser.add_argument("--schedule", default="generated_schedule.csv")
+    parser.add_argument("--suffix", default="", help="dataset file suffix, e.g. _test")
+    parser.add_argument("--time-budget", type=float, default=1.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="repaired_schedule.csv")
+    args = parser.parse_args(argv)
+
+    paths = tuple(f"{name}{args.suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    problem = SchedulingProblem(*load_dataset(paths))
+    schedule = load_schedule(args.schedule).itertuples(index=False, name=None)
+
+    repaired, report = repair_schedule(problem, schedule, args.time_budget, args.seed)
+    save_schedule(repaired, args.output)
+    print_report(report)
+    print(f"Repaired schedule saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0.0),
+}
+# Logit given to masked actions, as in sb3_contrib's MaskableCategorical
+MASKED_LOGIT = -1e8
+
+
+def policy_arrays(model):
+    """The actor of a trained PPO/MaskablePPO MlpPolicy as a dict of NumPy arrays.
+
+    Only what action selection needs is kept: the policy MLP layers, the
+    action head and the MultiDiscrete action sizes. The value network is
+    dropped.
+    """
+    # torch is only needed on the exporting side
+    from torch import nn
+    from stable_baselines3.common.torch_layers import FlattenExtractor
+
+    policy = model.policy
+    if not isinstance(policy.pi_features_extractor, FlattenExtractor):
+        raise ValueError("Only MlpPolicy (flattened Box observations) can be exported")
+
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "nvec": np.asarray(policy.action_space.nvec, dtype=np.int64),
+        "obs_dim": np.array(policy.observation_space.shape[0]),
+    }
+    activation = None
+    layers = [module for module in policy.mlp_extractor.policy_net]
+    for module in layers:
+        if isinstance(module, nn.Linear):
+            continue
+        name = type(module).__name__
+        if name not in ACTIVATIONS or activation not in (None, name):
+            raise ValueError(f"Unsupported policy activation {name}")
+        activation = name
+
+    linears = [module for module in layers if isinstance(module, nn.Linear)] + [policy.action_net]
+    for i, linear in enumerate(linears):
+        # Stored as (in, out) so inference is obs @ W + b
+        arrays[f"weight_{i}"] = linear.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f"bias_{i}"] = linear.bias.detach().cpu().numpy().astype(np.float32)
+    arrays["activation"] = np.array(activation or "Tanh")
+    return arrays
+
+
+def export_policy(model, path):
+    """Write policy_arrays(model) to a .npz file for NumpyPolicy.load."""
+    np.savez(path, **policy_arrays(model))
+
+
+class NumpyPolicy:
+    """Pure-NumPy stand-in for a trained SchedulingEnv policy's predict.
+
+    Loads the .npz written by export_policy. predict takes one observation
+    or a batch of them, optionally with MaskablePPO-style flat action masks,
+    and returns actions the same way model.predict does. Sampled actions
+    come from the same per-dimension categorical distributions as the torch
+    policy, drawn from this object's own generator.
+    """
+
+    def __init__(self, weights, biases, nvec, activation="Tanh", seed=None):
+        self.weights = weights
+        self.biases = biases
+        self.nvec = np.asarray(nvec, dtype=np.int64)
+        self.activation = activation
+        self._activation = ACTIVATIONS[activation]
+        self._offsets = np.concatenate(([0], np.cumsum(self.nvec)))
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_arrays(cls, arrays, seed=None):
+        """Build from policy_arrays output, e.g. a snapshot of a model still training."""
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError(f"Policy format {int(arrays['format_version'])} is not {FORMAT_VERSION}")
+        n_layers = sum(1 for key in arrays if key.startswith("weight_"))
+        weights = [np.asarray(arrays[f"weight_{i}"]) for i in range(n_layers)]
+        biases = [np.asarray(arrays[f"bias_{i}"]) for i in range(n_layers)]
+        return cls(weights, biases, arrays["nvec"], str(arrays["activation"]), seed=seed)
+
+    @classmethod
+    def load(cls, path, seed=None):
+        with np.load(path) as data:
+            return cls.from_arrays({key: data[key] for key in data.files}, seed=seed)
+
+    @property
+    def obs_dim(self):
+        return self.weights[0].shape[0]
+
+    def logits(self, obs, action_masks=None):
+        """Concatenated action logits, shape (batch, sum(nvec))."""
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = self._activation(x @ weight + bias)
+        logits = x @ self.weights[-1] + self.biases[-1]
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool).reshape(logits.shape)
+            logits = np.where(masks, logits, np.float32(MASKED_LOGIT))
+        return logits
+
+    def probabilities(self, obs, action_masks=None):
+        """Per-dimension action probabilities, a list of (batch, n) arrays."""
+        logits = self.logits(obs, action_masks)
+        probs = []
+        for start, end in zip(self._offsets[:-1], self._offsets[1:]):
+            dim = logits[:, start:end]
+            exp = np.exp(dim - dim.max(axis=1, keepdims=True))
+            probs.append(exp / exp.sum(axis=1, keepdims=True))
+        return probs
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False, action_masks=None):
+        """Same call and return convention as model.predict: (actions, state)."""
+        observation = np.asarray(observation)
+        logits = self.logits(observation, action_masks)
+        actions = np.empty((len(logits), len(self.nvec)), dtype=np.int64)
+        for d, (start, end) in enumerate(zip(self._offsets[:-1], self._offsets[1:])):
+            dim = logits[:, start:end]
+            if not deterministic:
+                # Gumbel-max: argmax of perturbed logits samples the softmax
+                dim = dim - np.log(-np.log(self.rng.random(dim.shape, dtype=np.float32)))
+            actions[:, d] = dim.argmax(axis=1)
+        if observation.ndim == 1:
+            actions = actions[0]
+        return actions, state
+
+
+def load_policy(path, use_masking=False):
+    """NumpyPolicy for a .npz path, otherwise the SB3 model saved at path."""
+    if str(path).endswith(".npz"):
+        return NumpyPolicy.load(path)
+    from RLModel import get_algorithm
+    return get_algorithm(use_masking).load(path, device="cpu")
+
+
+def check_parity(model, policy, observations, action_masks=None, samples=2000, seed=0):
+    """Compare a NumpyPolicy against the torch model it was exported from.
+
+    Returns the largest absolute probability difference, the fraction of
+    deterministic actions that match, and the largest gap between the
+    NumpyPolicy's sampled action frequencies for the first observation and
+    the torch probabilities.
+    """
+    import torch
+
+    obs_tensor, _ = model.policy.obs_to_tensor(observations)
+    with torch.no_grad():
+        distribution = model.policy.get_distribution(obs_tensor)
+        if action_masks is not None:
+            distribution.apply_masking(action_masks)
+        # SB3 names the per-dimension list "distribution", sb3_contrib "distributions"
+        dims = distribution.distributions if action_masks is not None else distribution.distribution
+        torch_probs = [dist.probs.cpu().numpy() for dist in dims]
+    if action_masks is not None:
+        torch_actions, _ = model.predict(observations, deterministic=True, action_masks=action_masks)
+    else:
+        torch_actions, _ = model.predict(observations, deterministic=True)
+
+    numpy_probs = policy.probabilities(observations, action_masks)
+    numpy_actions, _ = policy.predict(observations, deterministic=True, action_masks=action_masks)
+
+    policy.rng = np.random.default_rng(seed)
+    first = np.repeat(observations[:1], samples, axis=0)
+    first_masks = None if action_masks is None else np.repeat(action_masks[:1], samples, axis=0)
+    sampled, _ = policy.predict(first, action_masks=first_masks)
+    frequency_gap = max(
+        np.abs(np.bincount(sampled[:, d], minlength=n) / samples - torch_probs[d][0]).max()
+        for d, n in enumerate(policy.nvec)
+    )
+
+    return {
+        "max_prob_diff": float(max(np.abs(t - n).max() for t, n in zip(torch_probs, numpy_probs))),
+        "deterministic_match": float((torch_actions == numpy_actions).all(axis=1).mean()),
+        "sample_frequency_gap": float(frequency_gap),
+    }
+
+
+def collect_observations(env, count, seed=0):
+    """Observations (and action masks) from random rollouts of env."""
+    obs, _ = env.reset(seed=seed)
+    observations, masks = [], []
+    for _ in range(count):
+        observations.append(np.array(obs))
+        masks.append(env.action_masks())
+        obs, _, done, _, _ = env.step(env.action_space.sample())
+        if done:
+            obs, _ = env.reset()
+    return np.stack(observations), np.stack(masks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a trained policy to NumPy and check it against torch.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", default="scheduling_rl_model")
+    parser.add_argument("--output", default="scheduling_policy.npz")
+    parser.add_argument("--masking", action="store_true", default=None,
+                        help="the model is a MaskablePPO (default: config.USE_ACTION_MASKING)")
+    parser.add_argument("--suffix", default="", help="dataset used by check, e.g. _test")
+    parser.add_argument("--observations", type=int, default=1000)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args(argv)
+
+    import config
+    from DataSchema import load_dataset
+    from RLModel import SchedulingEnv, get_algorithm
+
+    use_masking = config.USE_ACTION_MASKING if args.masking is None else args.masking
+    model = get_algorithm(use_masking).load(args.model, device="cpu")
+
+    if args.command == "export":
+        export_policy(model, args.output)
+        print(f"Policy exported to {args.output}")
+        return 0
+
+    paths = tuple(f"{name}{args.suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    env = SchedulingEnv(*load_dataset(paths), pad_to=config.PAD_TO)
+    observations, masks = collect_observations(env, args.observations)
+    policy = NumpyPolicy.load(args.output)
+
+    report = check_parity(model, policy, observations, masks if use_masking else None)
+    for name, value in report.items():
+        print(f"{name:<24} {value:.3g}")
+
+    start = time.perf_counter()
+    policy.predict(observations)
+    numpy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    model.predict(observations)
+    torch_time = time.perf_counter() - start
+    print(f"Batched predict on {len(observations)} observations: numpy {numpy_time * 1e3:.2f}ms, "
+          f"torch {torch_time * 1e3:.2f}ms")
+
+    if report["max_prob_diff"] > args.tolerance or report["deterministic_match"] < 1.0:
+        print("Parity check FAILED")
+        return 1
+    print("Parity check passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import time
+
+# Phases timed by an instrumented training run. env_step includes the
+# validity_check, reward and obs_build time spent inside it, and rollout
+# includes env_step and callback.
+PHASES = (
+    "env_step",
+    "validity_check",
+    "reward",
+    "obs_build",
+    "callback",
+    "rollout",
+    "optimization",
+)
+
+
+class PhaseTimer:
+    """Accumulated wall time and call count per phase.
+
+    Timing is added by replacing bound methods on an instance with timed
+    wrappers (see instrument), so objects built without a timer run their
+    original methods with no extra work at all.
+    """
+
+    def __init__(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+
+    def add(self, phase, seconds, calls=1):
+        self.totals[phase] += seconds
+        self.counts[phase] += calls
+
+    def wrap(self, phase, func):
+        totals, counts, clock = self.totals, self.counts, time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                totals[phase] += clock() - start
+                counts[phase] += 1
+
+        return timed
+
+    def merge(self, other):
+        for phase in PHASES:
+            self.add(phase, other.totals[phase], other.counts[phase])
+
+    def reset(self):
+        for phase in PHASES:
+            self.totals[phase] = 0.0
+            self.counts[phase] = 0
+
+    def report(self):
+        """phase -> {"seconds", "calls", "mean_us"} for every phase that ran."""
+        return {
+            phase: {
+                "seconds": self.totals[phase],
+                "calls": self.counts[phase],
+                "mean_us": 1e6 * self.totals[phase] / self.counts[phase],
+            }
+            for phase in PHASES if self.counts[phase]
+        }
+
+
+def instrument(obj, timer, methods):
+    """Time obj's methods by shadowing them with instance attributes.
+
+    methods is a sequence of (phase, method name) pairs; several methods can
+    share a phase.
+    """
+    for phase, name in methods:
+        setattr(obj, name, timer.wrap(phase, getattr(obj, name)))
+
+
+def format_report(report):
+    lines = [f"{'phase':<16} {'seconds':>10} {'calls':>10} {'mean (us)':>10}"]
+    for phase, stats in report.items():
+        lines.append(f"{phase:<16} {stats['seconds']:>10.3f} {stats['calls']:>10,} {stats['mean_us']:>10.2f}")
+    return "\n".join(lines)
@@ -1,23 +1,100 @@
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
-from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS
-
-class SchedulingEnv(gym.Env):
-    def __init__(self, teachers_df, students_df, rooms_df, times_df, max_steps=1000, target_lessons=None):
-        super(SchedulingEnv, self).__init__()
-
+from config import INSTRUMENTS
+from DataSchema import is_normalized, teacher_capacity, validate_dataset
+from EnvEvents import OUTCOME_PLACED, OUTCOME_INVALID, OUTCOME_OUT_OF_BOUNDS
+from Profiling import PhaseTimer, instrument
+
+
+class SchedulingTables:
+    """Integer-indexed view of the scheduling DataFrames.
+
+    Built once per environment so that nothing in the step loop has to touch
+    pandas: students carry an instrument code, teachers an instrument bitmask
+    (see DataSchema) and the student x teacher compatibility matrix is a
+    single bitwise AND across all teachers.
+    """
+
+    def __init__(self, teachers_df, students_df):
+        self.instruments = INSTRUMENTS
+        self.student_instrument = students_df["Instrument_Code"].to_numpy(dtype=np.int64)
+        self.teacher_skills = teachers_df["Instrument_Mask"].to_numpy(dtype=np.int64)
+
+        # compatible[s, t] is True when teacher t can teach student s's instrument
+        self.compatible = (self.teacher_skills[None, :] & (1 << self.student_instrument)[:, None]) != 0
+        self._compatible_obs = None
+
+    @property
+    def compatible_obs(self):
+        # float32 copy for observations, built on first use since the solvers only need compatible
+        if self._compatible_obs is None:
+            self._compatible_obs = self.compatible.astype(np.float32)
+        return self._compatible_obs
+
+    def extend(self, teacher_skills=(), student_instrument=()):
+        """Append teachers (instrument bitmasks) and students (instrument codes), keeping existing indices."""
+        student_instrument = np.asarray(student_instrument, dtype=np.int64)
+        teacher_skills = np.asarray(teacher_skills, dtype=np.int64)
+        if len(student_instrument):
+            rows = (self.teacher_skills[None, :] & (1 << student_instrument)[:, None]) != 0
+            self.student_instrument = np.concatenate((self.student_instrument, student_instrument))
+            self.compatible = np.concatenate((self.compatible, rows))
+        if len(teacher_skills):
+            columns = (teacher_skills[None, :] & (1 << self.student_instrument)[:, None]) != 0
+            self.teacher_skills = np.concatenate((self.teacher_skills, teacher_skills))
+            self.compatible = np.concatenate((self.compatible, columns), axis=1)
+        self._compatible_obs = None
+
+    def disable(self, teachers=(), students=()):
+        """Make teachers and students compatible with nobody, e.g. once they leave the instance."""
+        self.compatible[:, list(teachers)] = False
+        self.compatible[list(students), :] = False
+        self._compatible_obs = None
+
+
+def bucket_size(count):
+    """Smallest power of two >= count."""
+    return 1 << max(0, int(count) - 1).bit_length()
+
+
+def resolve_padding(pad_to, counts):
+    """Padded (teachers, students, rooms, slots) sizes for an instance.
+
+    pad_to=None sizes the spaces to the instance itself, "bucket" rounds each
+    count up to a power of two and a 4-tuple gives explicit sizes, e.g. those
+    a policy was trained with.
+    """
+    if pad_to is None:
+        return tuple(counts)
+    if pad_to == "bucket":
+        return tuple(bucket_size(count) for count in counts)
+
+    padded = tuple(int(size) for size in pad_to)
+    if len(padded) != 4 or any(size < count for size, count in zip(padded, counts)):
+        raise ValueError(f"pad_to {padded} must be 4 sizes no smaller than the instance "
+                         f"(teachers, students, rooms, slots) = {tuple(counts)}")
+    return padded
+
+
+class SchedulingInstance:
+    """One validated instance and everything the env derives from its DataFrames.
+
+    Built once per instance, so an env can switch to another instance on
+    reset (see Curriculum) without touching pandas.
+    """
+
+    def __init__(self, teachers_df, students_df, rooms_df, times_df):
+        # Frames from DataSchema.load_dataset are already validated
+        if not is_normalized(teachers_df, students_df):
+            teachers_df, students_df, rooms_df, times_df = validate_dataset(
+                teachers_df, students_df, rooms_df, times_df
+            )
         self.teachers = teachers_df.reset_index(drop=True)
         self.students = students_df.reset_index(drop=True)
         self.rooms = rooms_df.reset_index(drop=True)
         self.times = times_df.reset_index(drop=True)
 
-        self.max_steps = max_steps
-        self.target_lessons = target_lessons or len(self.students)
-        self.steps = 0
-        self.current_student_index = 0
-
-        # Mappings
         self.teacher_ids = self.teachers["Teacher_ID"].tolist()
         self.student_ids = self.students["Student_ID"].tolist()
         self.room_ids = self.rooms["Room_ID"].tolist()
@@ -27,152 +104,418 @@ class SchedulingEnv(gym.Env):
         self.student_mapping = {sid: idx for idx, sid in enumerate(self.student_ids)}
         self.room_mapping = {rid: idx for idx, rid in enumerate(self.room_ids)}
 
+        self.sizes = (len(self.teacher_ids), len(self.student_ids), len(self.room_ids), len(self.time_slots))
+        self.tables = SchedulingTables(self.teachers, self.students)
+        self.teacher_capacity = teacher_capacity(self.teachers, self.sizes[3])
+
+
+class SchedulingEnv(gym.Env):
+    """Assigns a teacher, room and time slot to each student in turn.
+
+    verbose=0 keeps the step loop free of any logging work, 1 prints the
+    outcome of every step and 2 also prints the raw action and coverage.
+    event_hook, if given, is called once per step with the action, an
+    OUTCOME_* code from EnvEvents and the reward components; an
+    EnvEvents.EventRecorder can be passed to keep them in a ring buffer.
+
+    The spaces are sized from the loaded data. pad_to (see resolve_padding)
+    pads them so one policy can serve several instance sizes: padded
+    observation entries stay zero and padded action indices are invalid.
+    The occupancy state always has the real sizes, so step cost does not
+    grow with the padding.
+
+    Teachers with a Max_Hours_Per_Week limit (see DataSchema.teacher_capacity)
+    take no more lessons than it allows. A running per-teacher load counter
+    keeps the check O(1), and each teacher's remaining capacity, as a
+    fraction of the slot count, is part of the observation.
+
+    The observation lives in one preallocated buffer that step() updates in
+    place for the lesson just placed and the next student, so get_obs()
+    neither allocates nor scans. It returns a copy unless copy_obs=False;
+    only turn that off when every observation is consumed before the next
+    step or reset (DummyVecEnv and SubprocVecEnv keep the terminal
+    observation across the auto-reset, so they need the copy).
+
+    profile=True keeps a Profiling.PhaseTimer in phase_timer and times step,
+    the validity check, reward computation and observation building. Without
+    it the methods are left untouched and cost nothing extra.
+
+    instance_sampler, if given, is asked for a new SchedulingInstance on
+    every reset (see Curriculum.InstancePool); the spaces stay those of
+    pad_to, which every sampled instance has to fit.
+    """
+
+    def __init__(self, teachers_df, students_df, rooms_df, times_df, max_steps=1000, target_lessons=None,
+                 verbose=0, event_hook=None, pad_to=None, copy_obs=True, profile=False, instance_sampler=None):
+        super(SchedulingEnv, self).__init__()
+
+        self.verbose = verbose
+        self.event_hook = event_hook
+        self.copy_obs = copy_obs
+
+        self.max_steps = max_steps
+        self._target_lessons = target_lessons
+        self.steps = 0
+        self.current_student_index = 0
+
+        instance = SchedulingInstance(teachers_df, students_df, rooms_df, times_df)
+        self.padded_sizes = resolve_padding(pad_to, instance.sizes)
+        padded_teachers, padded_students, padded_rooms, padded_slots = self.padded_sizes
+
         # New action space: teacher, room, time slot (no student)
         self.action_space = spaces.MultiDiscrete([
-            MAX_TEACHERS,
-            MAX_ROOMS,
-            TIME_SLOTS
+            padded_teachers,
+            padded_rooms,
+            padded_slots
         ])
 
-        # Observation: current student info (scaled)
+        # Observation: teacher compatibility for the current student, the
+        # scheduled-student vector and teacher remaining capacity, each zero
+        # padded
         self.observation_space = spaces.Box(
-            low=0.0, high=1.0, shape=(27,), dtype=np.float32
+            low=0.0, high=1.0, shape=(2 * padded_teachers + padded_students,), dtype=np.float32
         )
-        self.last_obs = []
+        self._scheduled_offset = padded_teachers
+        self._capacity_offset = padded_teachers + padded_students
+        self._obs = np.zeros(self.observation_space.shape, dtype=np.float32)
+
+        self.instance_sampler = instance_sampler
+        self._sizes = None
+        self._set_instance(instance)
+
+        # Action mask buffer laid out the way MaskablePPO expects for a
+        # MultiDiscrete space: the per-dimension masks concatenated.
+        self._mask_offsets = np.cumsum([0] + list(self.action_space.nvec))
+        self._action_mask = np.zeros(self._mask_offsets[-1], dtype=bool)
 
         self.schedule = []
 
-    def reset(self, **kwargs):
+        self.phase_timer = None
+        if profile:
+            self.phase_timer = PhaseTimer()
+            instrument(self, self.phase_timer, (
+                ("env_step", "step"),
+                ("validity_check", "_is_valid_action"),
+                ("reward", "_placement_rewards"),
+                ("obs_build", "_update_obs"),
+                ("obs_build", "get_obs"),
+            ))
+
+    def _set_instance(self, instance):
+        """Point the env at a SchedulingInstance and size the per-episode state for it."""
+        if instance.sizes != self._sizes:
+            # Raises if the instance does not fit the spaces
+            resolve_padding(self.padded_sizes, instance.sizes)
+        self.instance = instance
+        self.teachers = instance.teachers
+        self.students = instance.students
+        self.rooms = instance.rooms
+        self.times = instance.times
+        self.target_lessons = self._target_lessons or len(instance.student_ids)
+
+        # Mappings
+        self.teacher_ids = instance.teacher_ids
+        self.student_ids = instance.student_ids
+        self.room_ids = instance.room_ids
+        self.time_slots = instance.time_slots
+        self.teacher_mapping = instance.teacher_mapping
+        self.student_mapping = instance.student_mapping
+        self.room_mapping = instance.room_mapping
+
+        self.tables = instance.tables
+        self.teacher_capacity = instance.teacher_capacity
+
+        # Instances of the same size reuse the grids, views and buffers
+        if instance.sizes == self._sizes:
+            return
+        self._sizes = instance.sizes
+
+        # Occupancy grids, indexed by entity position and time slot index.
+        # The schedule list is only kept as an output log; all clash checks
+        # and reward bookkeeping go through these arrays.
+        num_teachers, num_students, num_rooms, num_slots = instance.sizes
+        self.teacher_busy = np.zeros((num_teachers, num_slots), dtype=bool)
+        self.room_busy = np.zeros((num_rooms, num_slots), dtype=bool)
+        self.student_busy = np.zeros((num_students, num_slots), dtype=bool)
+        self.student_scheduled = np.zeros(num_students, dtype=bool)
+        self.pair_scheduled = np.zeros((num_teachers, num_students), dtype=bool)
+        self.room_free_count = np.full(num_slots, num_rooms, dtype=np.int64)
+        self.num_scheduled_students = 0
+
+        # Workload: lessons each teacher has taken
+        self.teacher_load = np.zeros(num_teachers, dtype=np.int64)
+
+        # Views onto the real (unpadded) entries of the observation buffer
+        self._compatible_view = self._obs[:num_teachers]
+        self._scheduled_view = self._obs[self._scheduled_offset:self._scheduled_offset + num_students]
+        self._capacity_view = self._obs[self._capacity_offset:self._capacity_offset + num_teachers]
+
+    def set_instance_level(self, level):
+        """Curriculum hook: sample later resets from instance_sampler level `level`."""
+        self.instance_sampler.set_level(level)
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        if self.instance_sampler is not None:
+            self._set_instance(self.instance_sampler.sample(self.np_random))
         self.steps = 0
         self.schedule = []
         self.current_student_index = 0
-        self.last_obs = []
+        self.teacher_busy.fill(False)
+        self.room_busy.fill(False)
+        self.student_busy.fill(False)
+        self.student_scheduled.fill(False)
+        self.pair_scheduled.fill(False)
+        self.room_free_count.fill(len(self.room_ids))
+        self.num_scheduled_students = 0
+        self.teacher_load.fill(0)
+
+        self._obs.fill(0.0)
+        self._compatible_view[:] = self.tables.compatible_obs[0]
+        self._capacity_view[:] = self.teacher_capacity / len(self.time_slots)
+        if options is not None and options.get("state") is not None:
+            self._seed_from_state(options["state"])
         return self.get_obs(), {}
 
+    def _seed_from_state(self, state):
+        """Start the episode from an existing (partial) schedule.
+
+        state is a Solvers.OccupancyState for this instance. Its lessons stay
+        fixed and are listed first in self.schedule, busy cells without a
+        lesson (blocked teacher or room slots) stay unavailable, and the
+        episode then places the remaining unscheduled students in order.
+        """
+        self.teacher_busy[:] = state.teacher_busy
+        self.room_busy[:] = state.room_busy
+        self.room_free_count[:] = state.room_free_count
+        self.teacher_load[:] = state.teacher_load
+
+        students = np.flatnonzero(state.lesson_of[:, 0] >= 0)
+        teachers, rooms, slots = state.lesson_of[students].T
+        self.student_busy[students, slots] = True
+        self.student_scheduled[students] = True
+        self.pair_scheduled[teachers, students] = True
+        self.num_scheduled_students = len(students)
+        self.schedule = [
+            (self.teacher_ids[t], self.student_ids[s], self.room_ids[r], self.time_slots[slot])
+            for t, s, r, slot in zip(teachers, students, rooms, slots)
+        ]
+
+        self._scheduled_view[students] = 1.0
+        self._capacity_view[:] = (self.teacher_capacity - self.teacher_load) / len(self.time_slots)
+        self.current_student_index = -1
+        self._advance_student()
+        if self.current_student_index < len(self.student_ids):
+            self._compatible_view[:] = self.tables.compatible_obs[self.current_student_index]
+        else:
+            self._compatible_view[:] = 0.0
+
+    def _advance_student(self):
+        # Students placed by a seeded schedule are skipped
+        self.current_student_index += 1
+        while self.current_student_index < len(self.student_ids) and \
+                self.student_scheduled[self.current_student_index]:
+            self.current_student_index += 1
+
     def get_obs(self):
+        return self._obs.copy() if self.copy_obs else self._obs
+
+    def _update_obs(self, teacher_idx, student_idx):
+        """Bring the observation buffer up to date after a lesson is placed."""
         if self.current_student_index >= len(self.student_ids):
-            return np.zeros(self.observation_space.shape, dtype=np.float32)
+            # Every student is placed, the episode is over
+            self._obs.fill(0.0)
+            return
 
-        student_id = self.student_ids[self.current_student_index]
-        student = self.students[self.students["Student_ID"] == student_id].iloc[0]
-        instrument = student["Instrument"]
-
-        # Teacher compatibility mask (binary vector)
-        teacher_mask = np.array([
-            1.0 if instrument in t_instruments else 0.0
-            for t_instruments in self.teachers["Instruments"]
-        ], dtype=np.float32)
-
-        # Binary vector of scheduled students (global state)
-        scheduled_mask = np.zeros(len(self.student_ids), dtype=np.float32)
-        for lesson in self.schedule:
-            student_idx = self.student_mapping[lesson[1]]
-            scheduled_mask[student_idx] = 1.0
-
-        obs = np.concatenate([
-            teacher_mask,
-            scheduled_mask
-        ])
+        # Teacher compatibility mask for the next student
+        self._compatible_view[:] = self.tables.compatible_obs[self.current_student_index]
 
-        return obs
+        # Scheduled-student vector and remaining teacher capacity
+        self._scheduled_view[student_idx] = 1.0
+        self._capacity_view[teacher_idx] = \
+            (self.teacher_capacity[teacher_idx] - self.teacher_load[teacher_idx]) / len(self.time_slots)
 
     def step(self, action):
         self.steps += 1
         teacher_idx, room_idx, time_slot = action
-
-        # Validate indexes
-        if teacher_idx >= len(self.teacher_ids) or \
-           room_idx >= len(self.room_ids) or \
-           self.current_student_index >= len(self.student_ids) or \
-            time_slot >= len(self.time_slots):
-            return self.last_obs, -1.0, True, False, {"error": "index out of bounds"}
-
-        teacher_id = self.teacher_ids[teacher_idx]
-        student_id = self.student_ids[self.current_student_index]
-        room_id = self.room_ids[room_idx]
-        time = self.time_slots[time_slot]
-
-        reward = 0
+        student_idx = self.current_student_index
+
+        # Every student has been placed, there is nothing left to schedule.
+        # Padded action indices are handled as invalid actions below.
+        if student_idx >= len(self.student_ids):
+            if self.verbose >= 1:
+                print(f"⚠️ Out of bounds action {action}")
+            if self.event_hook is not None:
+                self.event_hook(self.steps, student_idx, teacher_idx, room_idx, time_slot,
+                                OUTCOME_OUT_OF_BOUNDS, 0.0, 0.0, 0.0, 0.0, -1.0, -1.0)
+            return self.get_obs(), -1.0, True, False, {"error": "index out of bounds"}
+
+        base_reward = first_time_reward = new_pair_reward = completion_reward = penalty = 0.0
         new_lesson = None
         info = {}
 
-        if self._is_valid_action(teacher_id, student_id, room_id, time_slot):
-            lesson = (teacher_id, student_id, room_id, time)
+        if self.verbose >= 2:
             print(action)
 
-            if lesson not in self.schedule:
-                self.current_student_index += 1
-
-                # Track existing status before update
-                prev_student_lessons = [l for l in self.schedule if l[1] == student_id]
-                already_scheduled = len(prev_student_lessons) > 0
-                prev_pair_exists = any(l[0] == teacher_id and l[1] == student_id for l in self.schedule)
-
-                # Add lesson to schedule
-                self.schedule.append(lesson)
-                new_lesson = lesson
+        if self._is_valid_action(teacher_idx, student_idx, room_idx, time_slot):
+            outcome = OUTCOME_PLACED
+            lesson = (
+                self.teacher_ids[teacher_idx],
+                self.student_ids[student_idx],
+                self.room_ids[room_idx],
+                self.time_slots[time_slot],
+            )
 
-                # Reward components
-                reward += 1.0  # ✅ Base reward
+            # A valid action can never repeat an existing lesson: that lesson
+            # would already occupy the teacher, room and student in this slot.
+            self._advance_student()
 
-                if not already_scheduled:
-                    print("📌 First time student scheduled")
-                    reward += 2.0
+            # Reward components, from the state before the lesson is added
+            base_reward = 1.0  # ✅ Base reward
+            first_time_reward, new_pair_reward = self._placement_rewards(teacher_idx, student_idx)
 
-                if not prev_pair_exists:
-                    print("👥 New teacher-student pair")
-                    reward += 0.5
-            else:
-                print("🛑 Duplicate scheduling penalty")
-                reward -= 1.0
+            # Add lesson to schedule
+            self._occupy(teacher_idx, student_idx, room_idx, time_slot)
+            self._update_obs(teacher_idx, student_idx)
+            self.schedule.append(lesson)
+            new_lesson = lesson
         else:
-            print("❌ Invalid action")
-            reward -= 10.0
+            outcome = OUTCOME_INVALID
+            if self.verbose >= 1:
+                print("❌ Invalid action")
+            penalty = -10.0
             info["error"] = "invalid action"
 
-        all_scheduled = len(set(l[1] for l in self.schedule)) == len(self.student_ids)
+        all_scheduled = self.num_scheduled_students == len(self.student_ids)
         done = self.steps >= self.max_steps or all_scheduled
         truncated = self.steps >= self.max_steps
 
         if all_scheduled:
-            print("✅ All student scheduled")
-            reward += 5.0
+            if self.verbose >= 1:
+                print("✅ All student scheduled")
+            completion_reward = 5.0
 
-        unique_students = len(set(l[1] for l in self.schedule))
-        info["coverage"] = unique_students / len(self.student_ids)
+        reward = base_reward + first_time_reward + new_pair_reward + completion_reward + penalty
+
+        info["coverage"] = self.num_scheduled_students / len(self.student_ids)
         info["new_lesson"] = new_lesson
 
-        print(f"✅ Coverage: {len(set(l[1] for l in self.schedule))} / {len(self.student_ids)}")
+        if self.verbose >= 2:
+            print(f"✅ Coverage: {self.num_scheduled_students} / {len(self.student_ids)}")
+
+        if self.event_hook is not None:
+            self.event_hook(self.steps, student_idx, teacher_idx, room_idx, time_slot, outcome,
+                            base_reward, first_time_reward, new_pair_reward, completion_reward, penalty, reward)
 
         return self.get_obs(), reward, done, truncated, info
 
-    def _is_valid_action(self, teacher_id, student_id, room_id, time_slot):
-        teacher = self.teachers[self.teachers["Teacher_ID"] == teacher_id].iloc[0]
-        student = self.students[self.students["Student_ID"] == student_id].iloc[0]
+    def _is_valid_action(self, teacher_idx, student_idx, room_idx, time_slot):
+        # Padded indices beyond the real entity counts
+        if teacher_idx >= len(self.teacher_ids) or \
+           room_idx >= len(self.room_ids) or \
+           time_slot >= len(self.time_slots):
+            return False
 
-        if student["Instrument"] not in teacher["Instruments"]:
+        if not self.tables.compatible[student_idx, teacher_idx]:
             return False
 
-        if any(
-            lesson[3] == time_slot and (
-                lesson[0] == teacher_id or
-                lesson[1] == student_id or
-                lesson[2] == room_id
-            )
-            for lesson in self.schedule
-        ):
+        if self.teacher_load[teacher_idx] >= self.teacher_capacity[teacher_idx]:
+            return False
+
+        if self.teacher_busy[teacher_idx, time_slot] or \
+           self.student_busy[student_idx, time_slot] or \
+           self.room_busy[room_idx, time_slot]:
             return False
 
         return True
 
+    def _placement_rewards(self, teacher_idx, student_idx):
+        """First-time and new-pair rewards for placing student_idx with teacher_idx."""
+        first_time_reward = new_pair_reward = 0.0
+
+        if not self.student_scheduled[student_idx]:
+            if self.verbose >= 1:
+                print("📌 First time student scheduled")
+            first_time_reward = 2.0
+
+        if not self.pair_scheduled[teacher_idx, student_idx]:
+            if self.verbose >= 1:
+                print("👥 New teacher-student pair")
+            new_pair_reward = 0.5
+
+        return first_time_reward, new_pair_reward
+
+    def _occupy(self, teacher_idx, student_idx, room_idx, time_slot):
+        self.teacher_busy[teacher_idx, time_slot] = True
+        self.room_busy[room_idx, time_slot] = True
+        self.room_free_count[time_slot] -= 1
+        self.student_busy[student_idx, time_slot] = True
+        self.pair_scheduled[teacher_idx, student_idx] = True
+        self.teacher_load[teacher_idx] += 1
+        if not self.student_scheduled[student_idx]:
+            self.student_scheduled[student_idx] = True
+            self.num_scheduled_students += 1
+
+    def action_masks(self):
+        """Per-dimension validity masks for the current student.
+
+        A teacher is allowed if they teach the student's instrument, are under
+        their workload limit and have a slot where the student is free and at
+        least one room is open; a slot is allowed if some such teacher is free
+        in it; a room is allowed if it is free in any allowed slot. Padded
+        indices beyond the real entity counts are always masked out. The
+        dimensions are sampled independently, so a masked action can still
+        clash, but every unmasked index is reachable.
+        """
+        mask = self._action_mask
+        mask.fill(False)
+        teacher_mask = mask[self._mask_offsets[0]:self._mask_offsets[1]]
+        room_mask = mask[self._mask_offsets[1]:self._mask_offsets[2]]
+        slot_mask = mask[self._mask_offsets[2]:self._mask_offsets[3]]
+
+        num_teachers = len(self.teacher_ids)
+        num_rooms = len(self.room_ids)
+        num_slots = len(self.time_slots)
+
+        student_idx = self.current_student_index
+        if student_idx < len(self.student_ids):
+            open_slots = ~self.student_busy[student_idx] & (self.room_free_count > 0)
+            teacher_slots = ~self.teacher_busy & open_slots
+            teacher_slots &= (self.tables.compatible[student_idx] &
+                              (self.teacher_load < self.teacher_capacity))[:, None]
+
+            teacher_mask[:num_teachers] = teacher_slots.any(axis=1)
+            slot_mask[:num_slots] = teacher_slots.any(axis=0)
+            room_mask[:num_rooms] = (~self.room_busy[:, slot_mask[:num_slots]]).any(axis=1)
+
+        # Nothing can be placed: leave every real index open so the policy
+        # distribution stays well defined and the env penalises the action.
+        if not teacher_mask.any() or not room_mask.any() or not slot_mask.any():
+            teacher_mask[:num_teachers] = True
+            room_mask[:num_rooms] = True
+            slot_mask[:num_slots] = True
+
+        return mask.copy()
+
     def decode_action(self, action):
         teacher_idx, room_idx, timeslot = action
 
-        if teacher_idx > len(self.teacher_ids) or room_idx > len(self.room_ids) or timeslot > len(self.time_slots):
+        if teacher_idx >= len(self.teacher_ids) or room_idx >= len(self.room_ids) or \
+           timeslot >= len(self.time_slots) or self.current_student_index >= len(self.student_ids):
             return []
 
         teacher_id = self.teacher_ids[teacher_idx]
         room_id = self.room_ids[room_idx]
         student_id = self.student_ids[self.current_student_index]
         time_slot = self.time_slots[timeslot]
-        return teacher_id, student_id, room_id, time_slot
\ No newline at end of file
+        return teacher_id, student_id, room_id, time_slot
+
+def get_algorithm(use_masking=False):
+    """Return the SB3 algorithm class to train or load the scheduling policy with."""
+    if use_masking:
+        # sb3-contrib is only needed for the masked policy
+        from sb3_contrib import MaskablePPO
+        return MaskablePPO
+
+    from stable_baselines3 import PPO
+    return PPO
@@ -1,40 +1,89 @@
-import pandas as pd
-from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
+import time
 
-from RLModel import SchedulingEnv
+from config import USE_ACTION_MASKING, N_ENVS, VEC_ENV_TYPE, SEED, PAD_TO, PROFILE_TRAINING, PROFILE_STEPS, \
+    RESUME_TRAINING, CHECKPOINT_DIR, CHECKPOINT_FREQ, TOTAL_TIMESTEPS, USE_CURRICULUM, CURRICULUM_LEVELS, \
+    CURRICULUM_PROMOTE_AT, CURRICULUM_WINDOW, EVAL_INSTANCES_DIR, EVAL_FREQ, EVAL_EPISODES, EVAL_WORKERS
+from Checkpointing import AsyncCheckpointCallback, clear_checkpoints, restore_checkpoint, save_model_atomic
+from Curriculum import CurriculumCallback
+from DataSchema import load_dataset
+from EnvFactory import make_curriculum_vec_env, make_scheduling_vec_env
+from EvaluationCallback import AsyncEvalCallback
+from InferenceService import discover_instances
+from RLModel import get_algorithm
 from TrainingLogger import TrainingLoggerCallback
 
+DATASET_PATHS = ("teachers.csv", "students.csv", "rooms.csv", "times.csv")
 
-def main():
-    # Load datasets
-    print("Loading datasets...")
-    teachers = pd.read_csv("teachers.csv")
-    students = pd.read_csv("students.csv")
-    rooms = pd.read_csv("rooms.csv")
-    times = pd.read_csv("times.csv")
-
-    print("Setting up model...")
-    env = make_vec_env(lambda: SchedulingEnv(teachers, students, rooms, times), n_envs=1)
-
-    model = PPO(
-        "MlpPolicy", env,
-        verbose=1,
-        device="auto",
-        learning_rate=0.0030353263270070634,
-        gamma=0.20010966437854416,
-        n_steps=512,
-        clip_range=0.3612469628098453,
-        ent_coef=0.000343079749565955,
-        batch_size=2048
-    )
-
-    # Train model with logging
-    log_callback = TrainingLoggerCallback(log_dir="training_logs.csv")
-    model.learn(total_timesteps=100000, callback=log_callback)
-
-    # Save model
-    model.save("scheduling_rl_model")
+
+def main(use_masking=USE_ACTION_MASKING, n_envs=N_ENVS, vectorization=VEC_ENV_TYPE, seed=SEED,
+         profile=PROFILE_TRAINING, curriculum=USE_CURRICULUM, resume=RESUME_TRAINING):
+    callbacks = []
+    state_callbacks = {}
+    if curriculum:
+        print(f"Setting up model with {n_envs} {vectorization} env(s) "
+              f"over {len(CURRICULUM_LEVELS)} curriculum levels...")
+        env = make_curriculum_vec_env(CURRICULUM_LEVELS, n_envs=n_envs, vectorization=vectorization, seed=seed,
+                                      pool_kwargs={"seed": seed}, env_kwargs={"pad_to": PAD_TO, "profile": profile})
+        state_callbacks["curriculum"] = CurriculumCallback(len(CURRICULUM_LEVELS), CURRICULUM_PROMOTE_AT,
+                                                           CURRICULUM_WINDOW)
+        callbacks.append(state_callbacks["curriculum"])
+    else:
+        # Load datasets
+        print("Loading datasets...")
+        teachers, students, rooms, times = load_dataset(DATASET_PATHS)
+
+        print(f"Setting up model with {n_envs} {vectorization} env(s)...")
+        env = make_scheduling_vec_env(teachers, students, rooms, times, n_envs=n_envs,
+                                      vectorization=vectorization, seed=seed, paths=DATASET_PATHS,
+                                      env_kwargs={"pad_to": PAD_TO, "profile": profile})
+
+    log_callback = TrainingLoggerCallback(log_dir="training_logs.arrow", log_interval=10, profile=profile,
+                                          cprofile_path="training_profile.prof" if profile else None,
+                                          cprofile_steps=PROFILE_STEPS)
+
+    # Pick up a preempted run from its newest checkpoint, or drop stale ones
+    # so a crash early in a fresh run can't resume an older run
+    algorithm = get_algorithm(use_masking)
+    model = None
+    if resume:
+        model = restore_checkpoint(algorithm, env, CHECKPOINT_DIR, logger_callback=log_callback,
+                                   state_callbacks=state_callbacks, device="auto")
+        if model is not None and curriculum:
+            # The envs were built at level 0; move them before learn resets them
+            env.env_method("set_instance_level", state_callbacks["curriculum"].level)
+    else:
+        clear_checkpoints(CHECKPOINT_DIR)
+    if model is None:
+        model = algorithm(
+            "MlpPolicy", env,
+            verbose=1,
+            device="auto",
+            learning_rate=0.0030353263270070634,
+            gamma=0.20010966437854416,
+            n_steps=512,
+            clip_range=0.3612469628098453,
+            ent_coef=0.000343079749565955,
+            batch_size=2048
+        )
+    checkpoint_callback = AsyncCheckpointCallback(CHECKPOINT_DIR, CHECKPOINT_FREQ, logger_callback=log_callback,
+                                                  state_callbacks=state_callbacks)
+    if EVAL_INSTANCES_DIR is not None:
+        callbacks.append(AsyncEvalCallback(discover_instances(EVAL_INSTANCES_DIR), EVAL_FREQ, EVAL_EPISODES,
+                                           EVAL_WORKERS, seed=seed, use_masking=use_masking))
+
+    # Train model with logging, up to exactly TOTAL_TIMESTEPS across restarts
+    start_timesteps = model.num_timesteps
+    start = time.perf_counter()
+    model.learn(total_timesteps=TOTAL_TIMESTEPS - start_timesteps,
+                callback=[log_callback, checkpoint_callback] + callbacks, reset_num_timesteps=False)
+    elapsed = time.perf_counter() - start
+    trained = model.num_timesteps - start_timesteps
+    print(f"Trained {trained} timesteps in {elapsed:.1f}s ({trained / elapsed:,.0f} steps/s)")
+    env.close()
+
+    # Save model; the run is complete, so its checkpoints are no longer needed
+    save_model_atomic(model, "scheduling_rl_model")
+    clear_checkpoints(CHECKPOINT_DIR)
 
 
 if __name__ == '__main__':
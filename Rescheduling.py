@@ -0,0 +1,439 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from DataSchema import SCHEDULE_COLUMNS, load_dataset, load_schedule, normalize_students, normalize_teachers, \
+    save_schedule, validate_dataset
+from Solvers import SOLVERS, OccupancyState, SchedulingProblem
+
+
+class ScheduleDelta:
+    """A change to an instance that already has a timetable.
+
+    Entities are referred to by id and slots by their Time Slot string:
+    remove_* are id lists, add_* are DataFrames in the dataset's own column
+    layout (raw Instruments lists are fine), block_teacher_slots and
+    block_room_slots are (id, slot) pairs that become unavailable, and
+    block_slots closes every room in the given slots.
+    """
+
+    def __init__(self, remove_teachers=(), remove_students=(), remove_rooms=(), add_teachers=None, add_students=None,
+                 add_rooms=None, block_teacher_slots=(), block_room_slots=(), block_slots=()):
+        self.remove_teachers = set(remove_teachers)
+        self.remove_students = set(remove_students)
+        self.remove_rooms = set(remove_rooms)
+        self.add_teachers = add_teachers
+        self.add_students = add_students
+        self.add_rooms = add_rooms
+        self.block_teacher_slots = [(teacher_id, str(slot)) for teacher_id, slot in block_teacher_slots]
+        self.block_room_slots = [(room_id, str(slot)) for room_id, slot in block_room_slots]
+        self.block_slots = [str(slot) for slot in block_slots]
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a delta from JSON-style data: lists of ids, row dicts and [id, slot] pairs."""
+        kwargs = dict(data)
+        for key in ("add_teachers", "add_students", "add_rooms"):
+            if kwargs.get(key) is not None:
+                kwargs[key] = pd.DataFrame(kwargs[key])
+        return cls(**kwargs)
+
+
+def _append_teachers(teachers, new_teachers, num_slots):
+    # New rows are normalized on their own first, so they carry the same
+    # encoded columns as the existing ones. Where only one side has a
+    # Max_Hours_Per_Week column the other side gets the hours of every slot,
+    # the limit teacher_capacity assumes when the column is missing.
+    new_teachers = normalize_teachers(new_teachers)
+    if "Max_Hours_Per_Week" in teachers.columns or "Max_Hours_Per_Week" in new_teachers.columns:
+        unlimited = float(num_slots * config.SLOT_HOURS)
+        if "Max_Hours_Per_Week" not in teachers.columns:
+            teachers = teachers.assign(Max_Hours_Per_Week=unlimited)
+        if "Max_Hours_Per_Week" not in new_teachers.columns:
+            new_teachers = new_teachers.assign(Max_Hours_Per_Week=unlimited)
+    return pd.concat([teachers, new_teachers], ignore_index=True)
+
+
+def apply_delta(dataset, delta):
+    """The (teachers, students, rooms, times) dataset with delta's entities removed and added."""
+    teachers, students, rooms, times = validate_dataset(*dataset)
+    teachers = teachers[~teachers["Teacher_ID"].isin(delta.remove_teachers)]
+    students = students[~students["Student_ID"].isin(delta.remove_students)]
+    rooms = rooms[~rooms["Room_ID"].isin(delta.remove_rooms)]
+
+    if delta.add_teachers is not None:
+        teachers = _append_teachers(teachers, delta.add_teachers, len(times))
+    if delta.add_students is not None:
+        students = pd.concat([students, normalize_students(delta.add_students)], ignore_index=True)
+    if delta.add_rooms is not None:
+        rooms = pd.concat([rooms, delta.add_rooms], ignore_index=True)
+    return validate_dataset(teachers, students, rooms, times)
+
+
+def _lesson_indices(problem, lessons):
+    """(teacher, student, room, slot) index arrays for a lesson frame, -1 for ids the problem lacks."""
+    return (
+        pd.Index(problem.teacher_ids).get_indexer(lessons["Teacher_ID"]),
+        pd.Index(problem.student_ids).get_indexer(lessons["Student_ID"]),
+        pd.Index(problem.room_ids).get_indexer(lessons["Room_ID"]),
+        pd.Index([str(slot) for slot in problem.time_slots]).get_indexer(lessons["Time Slot"].astype(str)),
+    )
+
+
+def _first_occurrences(keep, *keys):
+    # Among the lessons still kept, drop any that repeat an earlier one's key
+    kept = np.flatnonzero(keep)
+    duplicated = pd.DataFrame({i: key[kept] for i, key in enumerate(keys)}).duplicated().to_numpy()
+    keep[kept[duplicated]] = False
+
+
+def seed_state(problem, schedule, delta):
+    """OccupancyState with delta's blocks and every lesson of schedule that still fits.
+
+    A lesson is kept unless its teacher, student, room or slot is gone, the
+    teacher no longer teaches the student's instrument, its teacher or room
+    slot is blocked, it clashes with an earlier lesson, or its teacher is
+    past a (reduced) workload limit. All checks run on index arrays, so
+    seeding a large timetable costs a few vectorized passes.
+
+    Returns (state, kept) with kept a boolean array over the schedule rows.
+    """
+    state = OccupancyState(problem)
+    for teacher_id, slot in delta.block_teacher_slots:
+        if teacher_id in problem.teacher_mapping:
+            state.block_teacher(problem.teacher_mapping[teacher_id], problem.slot_mapping[slot])
+    for room_id, slot in delta.block_room_slots:
+        if room_id in problem.room_mapping:
+            state.block_room(problem.room_mapping[room_id], problem.slot_mapping[slot])
+    for slot in delta.block_slots:
+        for room_idx in range(problem.num_rooms):
+            state.block_room(room_idx, problem.slot_mapping[slot])
+
+    teachers, students, rooms, slots = _lesson_indices(problem, schedule)
+    keep = (teachers >= 0) & (students >= 0) & (rooms >= 0) & (slots >= 0)
+    t, s, r, slot = teachers[keep], students[keep], rooms[keep], slots[keep]
+    keep[keep] = problem.tables.compatible[s, t] & ~state.teacher_busy[t, slot] & ~state.room_busy[r, slot]
+
+    _first_occurrences(keep, students)
+    _first_occurrences(keep, teachers, slots)
+    _first_occurrences(keep, rooms, slots)
+
+    # Each teacher keeps their earliest listed lessons up to their limit
+    kept = np.flatnonzero(keep)
+    rank = pd.Series(teachers[kept]).groupby(teachers[kept]).cumcount().to_numpy()
+    keep[kept[rank >= problem.teacher_capacity[teachers[kept]]]] = False
+
+    state.place_many(teachers[keep], students[keep], rooms[keep], slots[keep])
+    return state, keep
+
+
+def _replan_with_policy(problem, dataset, state, model, use_masking, deterministic, max_steps):
+    # The policy episode starts from the seeded state and places the
+    # unscheduled students in order; its lessons are copied back into state.
+    from RLModel import SchedulingEnv
+
+    env = SchedulingEnv(*dataset, max_steps=max_steps, pad_to=config.PAD_TO)
+    obs, _ = env.reset(options={"state": state})
+    fixed = len(env.schedule)
+    done = env.current_student_index >= len(env.student_ids)
+    while not done:
+        if use_masking:
+            action, _ = model.predict(obs, deterministic=deterministic, action_masks=env.action_masks())
+        else:
+            action, _ = model.predict(obs, deterministic=deterministic)
+        obs, _, done, _, _ = env.step(action)
+    for lesson in env.schedule[fixed:]:
+        teacher_idx, student_idx, room_idx, time_slot = problem.lesson_indices(lesson)
+        state.place(teacher_idx, student_idx, room_idx, time_slot)
+
+
+class Rescheduler:
+    """A scheduled instance kept in memory, so each change costs about as much as the change.
+
+    The SchedulingProblem and OccupancyState are built once from dataset
+    and schedule (lessons that clash or no longer fit are dropped and
+    re-planned by the first apply). apply() then edits them in place:
+    removed entities are retired (their lessons removed, their indices kept
+    but unusable), blocked cells are closed, added entities are appended to
+    the arrays, and only the displaced and new students go to the solver.
+    Finding the lessons a change hits is a NumPy pass over the lessons;
+    adding teachers or students copies the compatibility matrix once.
+
+    mode "policy" is the exception: the env compiles its own tables, so the
+    current dataset and state are rebuilt for it on every call.
+    """
+
+    def __init__(self, dataset, schedule):
+        teachers, students, rooms, self.times = validate_dataset(*dataset)
+        # Frames in problem index order, including retired rows
+        self._teachers, self._students, self._rooms = teachers, students, rooms
+        self.problem = SchedulingProblem(teachers, students, rooms, self.times)
+        self.active_teachers = np.ones(self.problem.num_teachers, dtype=bool)
+        self.active_students = np.ones(self.problem.num_students, dtype=bool)
+        self.active_rooms = np.ones(self.problem.num_rooms, dtype=bool)
+
+        if not isinstance(schedule, pd.DataFrame):
+            schedule = pd.DataFrame(list(schedule), columns=SCHEDULE_COLUMNS)
+        self.state, kept = seed_state(self.problem, schedule, ScheduleDelta())
+        dropped = pd.Index(self.problem.student_ids).get_indexer(schedule["Student_ID"][~kept])
+        self._dropped = {int(s) for s in dropped if s >= 0 and not self.state.is_scheduled(s)}
+
+    @property
+    def dataset(self):
+        """The current (teachers, students, rooms, times), without retired entities."""
+        return (
+            self._teachers[self.active_teachers].reset_index(drop=True),
+            self._students[self.active_students].reset_index(drop=True),
+            self._rooms[self.active_rooms].reset_index(drop=True),
+            self.times,
+        )
+
+    def schedule(self):
+        return self.state.to_schedule()
+
+    def coverage(self):
+        return self.state.num_scheduled / max(int(self.active_students.sum()), 1)
+
+    def changed_lessons(self, before):
+        """Lessons that differ from a copy of state.lesson_of taken earlier."""
+        after = self.state.lesson_of
+        previous = np.full_like(after, -1)
+        previous[:len(before)] = before
+        changed = np.flatnonzero((after != previous).any(axis=1) & (after[:, 0] >= 0))
+        return [self.problem.lesson(int(after[s, 0]), int(s), int(after[s, 1]), int(after[s, 2])) for s in changed]
+
+    def _unschedule(self, students):
+        students = [int(s) for s in students if self.state.is_scheduled(s)]
+        for student_idx in students:
+            self.state.remove(student_idx)
+        return students
+
+    def _active_index(self, mapping, active, entity_id):
+        idx = mapping.get(entity_id)
+        return idx if idx is not None and active[idx] else None
+
+    def _check_new_ids(self, frame, column, mapping, active):
+        ids = frame[column]
+        if ids.duplicated().any() or any(self._active_index(mapping, active, i) is not None for i in ids):
+            raise ValueError(f"added rows repeat existing {column} values")
+
+    def _remove(self, delta):
+        """Apply delta's removals; returns (cancelled students, displaced students)."""
+        problem, state = self.problem, self.state
+        students = [s for s in (self._active_index(problem.student_mapping, self.active_students, i)
+                                for i in delta.remove_students) if s is not None]
+        cancelled = self._unschedule(students)
+        self.active_students[students] = False
+        self._dropped.difference_update(students)
+
+        displaced = []
+        teachers = [t for t in (self._active_index(problem.teacher_mapping, self.active_teachers, i)
+                                for i in delta.remove_teachers) if t is not None]
+        for teacher_idx in teachers:
+            occupants = state.occupant[teacher_idx]
+            displaced += self._unschedule(occupants[occupants >= 0])
+            state.teacher_busy[teacher_idx] = True
+        self.active_teachers[teachers] = False
+        problem.retire(teachers, students)
+
+        rooms = [r for r in (self._active_index(problem.room_mapping, self.active_rooms, i)
+                             for i in delta.remove_rooms) if r is not None]
+        if rooms:
+            displaced += self._unschedule(np.flatnonzero(np.isin(state.lesson_of[:, 1], rooms)))
+            for room_idx in rooms:
+                for time_slot in range(problem.num_slots):
+                    state.block_room(room_idx, time_slot)
+            self.active_rooms[rooms] = False
+        return cancelled, displaced
+
+    def _block(self, delta):
+        """Close delta's blocked cells, added entities included; returns the displaced students."""
+        problem, state = self.problem, self.state
+        displaced = []
+        for teacher_id, slot in delta.block_teacher_slots:
+            teacher_idx = self._active_index(problem.teacher_mapping, self.active_teachers, teacher_id)
+            if teacher_idx is not None:
+                time_slot = problem.slot_mapping[slot]
+                occupant = state.occupant[teacher_idx, time_slot]
+                displaced += self._unschedule([occupant] if occupant >= 0 else [])
+                state.block_teacher(teacher_idx, time_slot)
+        for room_id, slot in delta.block_room_slots:
+            room_idx = self._active_index(problem.room_mapping, self.active_rooms, room_id)
+            if room_idx is not None:
+                time_slot = problem.slot_mapping[slot]
+                lessons = state.lesson_of
+                in_cell = (lessons[:, 1] == room_idx) & (lessons[:, 2] == time_slot)
+                displaced += self._unschedule(np.flatnonzero(in_cell))
+                state.block_room(room_idx, time_slot)
+        for slot in delta.block_slots:
+            time_slot = problem.slot_mapping[slot]
+            displaced += self._unschedule(np.flatnonzero(state.lesson_of[:, 2] == time_slot))
+            for room_idx in range(problem.num_rooms):
+                state.block_room(room_idx, time_slot)
+        return displaced
+
+    def _add(self, delta):
+        """Append delta's new entities; returns the new student indices."""
+        problem = self.problem
+        teachers = students = rooms = None
+        if delta.add_teachers is not None:
+            teachers = normalize_teachers(delta.add_teachers)
+            self._check_new_ids(teachers, "Teacher_ID", problem.teacher_mapping, self.active_teachers)
+            self._teachers = _append_teachers(self._teachers, teachers, problem.num_slots)
+            teachers = self._teachers.iloc[problem.num_teachers:]
+            self.active_teachers = np.concatenate((self.active_teachers, np.ones(len(teachers), dtype=bool)))
+        if delta.add_students is not None:
+            students = normalize_students(delta.add_students)
+            self._check_new_ids(students, "Student_ID", problem.student_mapping, self.active_students)
+            self._students = pd.concat([self._students, students], ignore_index=True)
+            self.active_students = np.concatenate((self.active_students, np.ones(len(students), dtype=bool)))
+        if delta.add_rooms is not None:
+            rooms = delta.add_rooms.reset_index(drop=True)
+            self._check_new_ids(rooms, "Room_ID", problem.room_mapping, self.active_rooms)
+            self._rooms = pd.concat([self._rooms, rooms], ignore_index=True)
+            self.active_rooms = np.concatenate((self.active_rooms, np.ones(len(rooms), dtype=bool)))
+
+        first_student = problem.num_students
+        problem.extend(teachers, students, rooms)
+        self.state.grow()
+        return list(range(first_student, problem.num_students))
+
+    def _replan_with_policy(self, model, use_masking, deterministic, max_steps):
+        # A compact problem over the current dataset, seeded with the current
+        # lessons and every blocked cell, runs the policy episode; its new
+        # lessons are then placed in this state by id.
+        state = self.state
+        dataset = self.dataset
+        blocked_teachers = np.argwhere(state.teacher_busy & (state.occupant < 0) & self.active_teachers[:, None])
+        room_blocks = state.room_busy & self.active_rooms[:, None]
+        scheduled = np.flatnonzero(state.lesson_of[:, 0] >= 0)
+        room_blocks[state.lesson_of[scheduled, 1], state.lesson_of[scheduled, 2]] = False
+        problem = self.problem
+        blocks = ScheduleDelta(
+            block_teacher_slots=[(problem.teacher_ids[t], problem.time_slots[slot]) for t, slot in blocked_teachers],
+            block_room_slots=[(problem.room_ids[r], problem.time_slots[slot]) for r, slot in np.argwhere(room_blocks)],
+        )
+
+        compact = SchedulingProblem(*dataset)
+        compact_state, _ = seed_state(compact, pd.DataFrame(self.schedule(), columns=SCHEDULE_COLUMNS), blocks)
+        before = compact_state.lesson_of.copy()
+        _replan_with_policy(compact, dataset, compact_state, model, use_masking, deterministic, max_steps)
+        for student_idx in np.flatnonzero((compact_state.lesson_of[:, 0] >= 0) & (before[:, 0] < 0)):
+            teacher_idx, room_idx, time_slot = (int(v) for v in compact_state.lesson_of[student_idx])
+            lesson = compact.lesson(teacher_idx, int(student_idx), room_idx, time_slot)
+            state.place(*problem.lesson_indices(lesson))
+
+    def apply(self, delta, mode="greedy", model=None, use_masking=False, deterministic=True, max_steps=1000):
+        """Apply delta and re-plan the students it displaced or added.
+
+        Lessons the delta does not invalidate stay exactly as they are.
+        Displaced and new students are placed around them with the "greedy"
+        or "exact" solver, or with a trained policy (mode "policy", model
+        from NumpyPolicy.load_policy), which also tries any students that
+        were already unscheduled.
+
+        Returns a report; report["changed_lessons"] holds every lesson that
+        is new or different after the call, which is all that has to be
+        sent out again.
+        """
+        if mode == "policy" and model is None:
+            raise ValueError("mode 'policy' needs a model")
+        if mode != "policy" and mode not in SOLVERS:
+            raise ValueError(f"Unknown mode '{mode}', expected 'policy' or one of {sorted(SOLVERS)}")
+
+        start = time.perf_counter()
+        before = self.state.lesson_of.copy()
+        # Removals first so a delta can bring an id back, blocks last so they
+        # also cover the entities it adds
+        cancelled, displaced = self._remove(delta)
+        added = self._add(delta)
+        displaced += self._block(delta) + sorted(self._dropped)
+        self._dropped = set()
+        pending = np.array(sorted({s for s in (*displaced, *added) if not self.state.is_scheduled(s)}), dtype=np.int64)
+
+        if mode == "policy":
+            self._replan_with_policy(model, use_masking, deterministic, max_steps)
+        else:
+            SOLVERS[mode](self.problem, self.state, students=pending)
+
+        changed = self.changed_lessons(before)
+        unchanged = (self.state.lesson_of[:len(before)] == before).all(axis=1) & (before[:, 0] >= 0)
+        return {
+            "kept": int(unchanged.sum()),
+            "cancelled": len(cancelled),
+            "displaced": len(displaced),
+            "added_students": len(added),
+            "placed": len(changed),
+            "unplaced": [self.problem.student_ids[s] for s in pending if not self.state.is_scheduled(s)],
+            "changed_lessons": changed,
+            "coverage": self.coverage(),
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def reschedule(dataset, schedule, delta, mode="greedy", model=None, use_masking=False, deterministic=True,
+               max_steps=1000):
+    """Apply one delta to a scheduled instance, see Rescheduler.apply.
+
+    dataset is the (teachers, students, rooms, times) the schedule was made
+    for and schedule its lesson tuples or a load_schedule frame. This builds
+    a Rescheduler for a single change; to apply a stream of changes keep one
+    Rescheduler, whose later deltas skip the build.
+
+    Returns (new dataset, new schedule, report).
+    """
+    start = time.perf_counter()
+    rescheduler = Rescheduler(dataset, schedule)
+    report = rescheduler.apply(delta, mode, model, use_masking, deterministic, max_steps)
+    report["seconds"] = time.perf_counter() - start
+    return rescheduler.dataset, rescheduler.schedule(), report
+
+
+def print_report(report):
+    print(f"Kept {report['kept']} lessons, cancelled {report['cancelled']}, displaced {report['displaced']}, "
+          f"{report['added_students']} new students")
+    print(f"Re-planned {report['placed']} lessons, {len(report['unplaced'])} students left unplaced, "
+          f"coverage {report['coverage']:.1%} in {report['seconds'] * 1e3:.1f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply changes to a scheduled instance and re-plan what they affect.")
+    parser.add_argument("deltas", nargs="+", help="JSON files with the ScheduleDelta fields, applied in order")
+    parser.add_argument("--schedule", default="generated_schedule.csv")
+    parser.add_argument("--suffix", default="", help="dataset file suffix, e.g. _test")
+    parser.add_argument("--mode", choices=["policy", *sorted(SOLVERS)], default="greedy")
+    parser.add_argument("--model", default=config.INFERENCE_MODEL, help="policy for --mode policy")
+    parser.add_argument("--output", default="rescheduled_schedule.csv")
+    parser.add_argument("--changes", default="changed_lessons.csv", help="where to write only the new lessons")
+    args = parser.parse_args(argv)
+
+    paths = tuple(f"{name}{args.suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    deltas = []
+    for path in args.deltas:
+        with open(path) as f:
+            deltas.append(ScheduleDelta.from_dict(json.load(f)))
+
+    model = None
+    if args.mode == "policy":
+        from NumpyPolicy import load_policy
+        model = load_policy(args.model, config.USE_ACTION_MASKING)
+
+    start = time.perf_counter()
+    rescheduler = Rescheduler(load_dataset(paths), load_schedule(args.schedule))
+    print(f"Loaded the scheduled instance in {(time.perf_counter() - start) * 1e3:.1f}ms")
+    initial = rescheduler.state.lesson_of.copy()
+    for path, delta in zip(args.deltas, deltas):
+        print(f"\n{path}:")
+        print_report(rescheduler.apply(delta, args.mode, model, use_masking=config.USE_ACTION_MASKING))
+
+    save_schedule(rescheduler.schedule(), args.output)
+    save_schedule(rescheduler.changed_lessons(initial), args.changes)
+    print(f"Schedule saved to {args.output}, changed lessons to {args.changes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from DataSchema import SCHEDULE_COLUMNS, load_dataset, load_schedule, teacher_capacity, validate_dataset
+
+VIOLATIONS = (
+    "unknown_id",
+    "teacher_double_booking",
+    "room_double_booking",
+    "student_double_booking",
+    "instrument_mismatch",
+    "over_workload",
+)
+
+
+def _repeats(*keys):
+    """Boolean mask of rows whose key was already used by an earlier row.
+
+    keys are (values, size) pairs of non-negative int arrays and their
+    range, combined into one int64 key; a stable sort groups equal keys in
+    row order, so the first row of every group is the one left unflagged.
+    """
+    key = np.zeros(len(keys[0][0]), dtype=np.int64)
+    for values, size in keys:
+        key = key * size + values
+    order = np.argsort(key, kind="stable")
+    repeated = np.zeros(len(key), dtype=bool)
+    repeated[order[1:]] = key[order[1:]] == key[order[:-1]]
+    return repeated
+
+
+def _gaps(teachers, slots, days, num_teachers):
+    """Idle slots between each teacher's first and last lesson of a day, summed per teacher."""
+    if len(teachers) == 0:
+        return np.zeros(num_teachers)
+    groups = teachers * (days.max() + 1) + days
+    order = np.lexsort((slots, groups))
+    groups, slots = groups[order], slots[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    counts = np.diff(np.r_[starts, len(groups)])
+    spans = np.maximum.reduceat(slots, starts) - np.minimum.reduceat(slots, starts) + 1
+    teacher_of_group = teachers[order][starts]
+    return np.bincount(teacher_of_group, weights=spans - counts, minlength=num_teachers)
+
+
+def validate_schedule(dataset, schedule, details=False):
+    """Check a schedule against its dataset and score it.
+
+    dataset is (teachers, students, rooms, times) and schedule a frame with
+    SCHEDULE_COLUMNS (as from load_schedule) or lesson tuples. Every check
+    runs on integer index arrays: ids are mapped with pandas indexers,
+    double bookings are found by stable-sorting combined (entity, slot)
+    keys and per-entity counts come from bincount, so the cost is a few
+    O(n log n) passes with no per-lesson Python.
+
+    A lesson repeating an earlier lesson's teacher, room or student slot is
+    counted as that double booking; the earlier one is not. Lessons beyond a
+    teacher's workload limit are counted the same way.
+
+    Returns a report dict with "valid", "violations" (counts per kind in
+    VIOLATIONS) and "metrics". With details=True the rows with a violation
+    are also returned, as a frame with a Violation column.
+    """
+    teachers, students, rooms, times = validate_dataset(*dataset)
+    if not isinstance(schedule, pd.DataFrame):
+        schedule = pd.DataFrame(list(schedule), columns=SCHEDULE_COLUMNS)
+    num_teachers, num_students, num_rooms, num_slots = len(teachers), len(students), len(rooms), len(times)
+
+    t = pd.Index(teachers["Teacher_ID"]).get_indexer(schedule["Teacher_ID"])
+    s = pd.Index(students["Student_ID"]).get_indexer(schedule["Student_ID"])
+    r = pd.Index(rooms["Room_ID"]).get_indexer(schedule["Room_ID"])
+    slot = pd.Index(times["Time Slot"].astype(str)).get_indexer(schedule["Time Slot"].astype(str))
+
+    violation = np.full(len(schedule), "", dtype=object)
+    unknown = (t < 0) | (s < 0) | (r < 0) | (slot < 0)
+    violation[unknown] = "unknown_id"
+
+    # The remaining checks only see lessons whose ids all resolve
+    known = np.flatnonzero(~unknown)
+    t, s, r, slot = t[known], s[known], r[known], slot[known]
+
+    checks = {
+        "teacher_double_booking": _repeats((t, num_teachers), (slot, num_slots)),
+        "room_double_booking": _repeats((r, num_rooms), (slot, num_slots)),
+        "student_double_booking": _repeats((s, num_students), (slot, num_slots)),
+        # Same bitmask test as SchedulingTables, per lesson instead of a full student x teacher matrix
+        "instrument_mismatch": (teachers["Instrument_Mask"].to_numpy()[t] &
+                                (1 << students["Instrument_Code"].to_numpy()[s])) == 0,
+    }
+    # Rank of each lesson among its teacher's lessons, in row order
+    order = np.argsort(t, kind="stable")
+    starts = np.searchsorted(t[order], t[order])
+    rank = np.empty(len(t), dtype=np.int64)
+    rank[order] = np.arange(len(t)) - starts
+    checks["over_workload"] = rank >= teacher_capacity(teachers, num_slots)[t]
+
+    # Reverse order so each row is labelled with the first kind that applies
+    for name in reversed(list(checks)):
+        violation[known[checks[name]]] = name
+    checks["unknown_id"] = unknown
+    violations = {name: int(checks[name].sum()) for name in VIOLATIONS}
+
+    teacher_load = np.bincount(t, minlength=num_teachers)
+    room_load = np.bincount(r, minlength=num_rooms)
+    lessons_per_student = np.bincount(s, minlength=num_students)
+    days = pd.to_datetime(times["Time Slot"]).dt.normalize()
+    day_codes = pd.factorize(days)[0][slot]
+    gaps = _gaps(t, slot, day_codes, num_teachers)
+    mean_load = teacher_load.mean()
+
+    metrics = {
+        "lessons": len(schedule),
+        "coverage": float((lessons_per_student > 0).mean()),
+        "students_with_multiple_lessons": int((lessons_per_student > 1).sum()),
+        "teacher_load_mean": float(mean_load),
+        "teacher_load_max": int(teacher_load.max()),
+        "teacher_load_min": int(teacher_load.min()),
+        # Coefficient of variation, 0 when every teacher has the same load
+        "teacher_load_cv": float(teacher_load.std() / mean_load) if mean_load else 0.0,
+        "teachers_idle": int((teacher_load == 0).sum()),
+        "room_utilisation": float(len(known) / (num_rooms * num_slots)),
+        "room_utilisation_max": float(room_load.max() / num_slots),
+        "rooms_unused": int((room_load == 0).sum()),
+        "teacher_gap_slots": int(gaps.sum()),
+        "teacher_gap_slots_max": int(gaps.max()),
+    }
+
+    report = {
+        "valid": not any(violations.values()),
+        "violations": violations,
+        "metrics": metrics,
+    }
+    if details:
+        rows = violation != ""
+        report["details"] = schedule[rows].assign(Violation=violation[rows])
+    return report
+
+
+def print_report(report):
+    print("Schedule is valid" if report["valid"] else "Schedule has violations")
+    for name, count in report["violations"].items():
+        print(f"  {name:<32} {count:>10,}")
+    print("Metrics")
+    for name, value in report["metrics"].items():
+        print(f"  {name:<32} {value:>10,.3f}" if isinstance(value, float) else f"  {name:<32} {value:>10,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a schedule CSV for clashes and score its quality.")
+    parser.add_argument("--schedule", default="generated_schedule.csv")
+    parser.add_argument("--suffix", default="", help="dataset file suffix, e.g. _test")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    parser.add_argument("--details", help="write the violating lessons to this CSV file")
+    args = parser.parse_args(argv)
+
+    paths = tuple(f"{name}{args.suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    dataset = load_dataset(paths)
+    schedule = load_schedule(args.schedule)
+
+    start = time.perf_counter()
+    report = validate_schedule(dataset, schedule, details=args.details is not None)
+    elapsed = time.perf_counter() - start
+
+    print_report(report)
+    print(f"Checked {len(schedule):,} lessons in {elapsed * 1e3:.1f}ms")
+    if args.details:
+        report.pop("details").to_csv(args.details, index=False)
+        print(f"Violating lessons saved to {args.details}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["valid"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
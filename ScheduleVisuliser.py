@@ -1,70 +1,142 @@
-﻿import pandas as pd
-import matplotlib.pyplot as plt
+﻿import argparse
+import os
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # Images only, no GUI backend needed
 import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime, timedelta
-
-# Load data
-data = [
-    ("T004", "S001", "R04", "2025-01-01 20:30:00"),
-    ("T004", "S002", "R06", "2025-01-01 16:00:00"),
-    ("T005", "S003", "R07", "2025-01-01 19:00:00"),
-    ("T002", "S004", "R14", "2025-01-01 08:30:00"),
-    ("T005", "S005", "R05", "2025-01-01 14:30:00"),
-    ("T004", "S006", "R08", "2025-01-01 10:00:00"),
-    ("T005", "S007", "R04", "2025-01-01 22:00:00"),
-    ("T004", "S008", "R12", "2025-01-01 09:30:00"),
-    ("T004", "S009", "R15", "2025-01-01 11:30:00"),
-    ("T005", "S010", "R13", "2025-01-02 05:30:00"),
-    ("T004", "S011", "R01", "2025-01-01 19:30:00"),
-    ("T006", "S012", "R09", "2025-01-01 14:00:00"),
-    ("T005", "S013", "R15", "2025-01-02 00:30:00"),
-    ("T004", "S014", "R09", "2025-01-01 23:00:00"),
-    ("T005", "S015", "R10", "2025-01-02 00:30:00"),
-    ("T004", "S016", "R05", "2025-01-01 18:30:00"),
-    ("T004", "S017", "R08", "2025-01-02 03:30:00"),
-    ("T004", "S018", "R06", "2025-01-01 22:00:00"),
-    ("T004", "S019", "R15", "2025-01-01 22:30:00"),
-    ("T005", "S020", "R11", "2025-01-01 15:00:00")
-]
-
-df = pd.DataFrame(data, columns=["Teacher", "Student", "Room", "Datetime"])
-df['Datetime'] = pd.to_datetime(df['Datetime'])
-df['Endtime'] = df['Datetime'] + timedelta(minutes=30)
-
-# Plot
-fig, ax = plt.subplots(figsize=(16, 8))
-teachers = sorted(df['Teacher'].unique())
-colors = plt.cm.get_cmap('tab10', len(teachers))
-
-for i, teacher in enumerate(teachers):
-    teacher_data = df[df['Teacher'] == teacher]
-    for _, row in teacher_data.iterrows():
-        start = mdates.date2num(row['Datetime'])
-        duration = mdates.date2num(row['Endtime']) - start
-        ax.broken_barh(
-            [(start, duration)],
-            (i, 0.8),
-            facecolors=colors(i),
-            edgecolor='black',
-            linewidth=1.5
-        )
-        # Text annotation
-        label = f"{row['Student']}\n{row['Room']}"
-        ax.text(start + duration / 2, i + 0.4, label,
-                va='center', ha='center', fontsize=8, color='white', weight='bold')
-
-# Format axis
-ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d %H:%M'))
-plt.xticks(rotation=45)
-plt.yticks([i + 0.4 for i in range(len(teachers))], teachers)
-plt.title("Teacher Scheduling Calendar")
-plt.xlabel("Time")
-plt.ylabel("Teacher")
-
-# Clean style
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-plt.grid(axis='x', linestyle='--', alpha=0.5)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+import pandas as pd
+
+from config import SLOT_HOURS
+from DataSchema import load_schedule
+
+# Rows and facets a timetable can be drawn by
+GROUPS = {
+    "teacher": "Teacher_ID",
+    "room": "Room_ID",
+}
+
+
+def prepare_schedule(schedule):
+    """Schedule frame with parsed Start/End times and a Day column."""
+    schedule = schedule.copy()
+    schedule["Start"] = pd.to_datetime(schedule["Time Slot"])
+    schedule["End"] = schedule["Start"] + pd.Timedelta(hours=SLOT_HOURS)
+    schedule["Day"] = schedule["Start"].dt.strftime("%Y-%m-%d")
+    return schedule
+
+
+def draw_page(ax, lessons, row_column, label_column, label_limit):
+    """Draw one timetable page: a row per value of row_column, one bar per lesson.
+
+    All bars of a row go into a single broken_barh collection, so drawing
+    cost grows with the number of rows rather than lessons. Lessons are
+    labelled only while the page has at most label_limit of them.
+    """
+    rows = sorted(lessons[row_column].unique())
+    row_idx = pd.Categorical(lessons[row_column], categories=rows).codes
+    starts = mdates.date2num(lessons["Start"].to_numpy())
+    widths = mdates.date2num(lessons["End"].to_numpy()) - starts
+    colors = plt.get_cmap("tab20")
+
+    order = np.argsort(row_idx, kind="stable")
+    bounds = np.searchsorted(row_idx[order], np.arange(len(rows) + 1))
+    for i in range(len(rows)):
+        idx = order[bounds[i]:bounds[i + 1]]
+        ax.broken_barh(np.column_stack((starts[idx], widths[idx])), (i, 0.8), facecolors=colors(i % 20),
+                       edgecolor="black", linewidth=0.5 if len(lessons) > label_limit else 1.5)
+
+    if len(lessons) <= label_limit:
+        labels = lessons["Student_ID"].astype(str) + "\n" + lessons[label_column].astype(str)
+        for x, y, label in zip(starts + widths / 2, row_idx + 0.4, labels):
+            ax.text(x, y, label, va="center", ha="center", fontsize=8, color="white", weight="bold")
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d %H:%M"))
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_yticks(np.arange(len(rows)) + 0.4, rows)
+    ax.set_ylim(-0.2, len(rows))
+
+    # Clean style
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.grid(axis="x", linestyle="--", alpha=0.5)
+
+
+def render_schedule(schedule, output_dir="schedule_plots", rows="teacher", facet=None, rows_per_page=40,
+                    label_limit=300, image_format="png", dpi=100):
+    """Write the schedule as timetable images and return their paths.
+
+    rows is "teacher" or "room". facet splits the timetable into separate
+    images per "day", "teacher" or "room" first, and every image holds at
+    most rows_per_page rows, further ones going to extra pages.
+    """
+    if rows not in GROUPS:
+        raise ValueError(f"Unknown rows '{rows}', expected one of {sorted(GROUPS)}")
+    if facet not in (None, "day", *GROUPS):
+        raise ValueError(f"Unknown facet '{facet}', expected 'day', 'teacher' or 'room'")
+    if facet == rows:
+        # One row per image would be pointless; use the other group for rows
+        rows = "room" if rows == "teacher" else "teacher"
+    row_column = GROUPS[rows]
+    label_column = GROUPS["room" if rows == "teacher" else "teacher"]
+
+    schedule = prepare_schedule(schedule)
+    facets = [(None, schedule)] if facet is None else schedule.groupby(GROUPS.get(facet, "Day"), sort=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for facet_value, lessons in facets:
+        row_values = sorted(lessons[row_column].unique())
+        pages = range(0, len(row_values), rows_per_page)
+        for page, first in enumerate(pages):
+            page_rows = row_values[first:first + rows_per_page]
+            page_lessons = lessons[lessons[row_column].isin(page_rows)]
+
+            fig, ax = plt.subplots(figsize=(16, max(4.0, 0.3 * len(page_rows) + 2)))
+            draw_page(ax, page_lessons, row_column, label_column, label_limit)
+
+            title = f"{rows.capitalize()} Scheduling Calendar"
+            name = f"schedule_{rows}"
+            if facet_value is not None:
+                title += f" - {facet} {facet_value}"
+                name += f"_{facet}_{facet_value}"
+            if len(pages) > 1:
+                title += f" ({page + 1}/{len(pages)})"
+                name += f"_page{page + 1}"
+            ax.set_title(title)
+            ax.set_xlabel("Time")
+            ax.set_ylabel(rows.capitalize())
+            fig.tight_layout()
+
+            path = os.path.join(output_dir, f"{name}.{image_format}")
+            fig.savefig(path, dpi=dpi)
+            plt.close(fig)
+            paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a schedule CSV as timetable images.")
+    parser.add_argument("--schedule", default="generated_schedule.csv")
+    parser.add_argument("--output-dir", default="schedule_plots")
+    parser.add_argument("--rows", choices=sorted(GROUPS), default="teacher")
+    parser.add_argument("--facet", choices=["day", *sorted(GROUPS)], default=None)
+    parser.add_argument("--rows-per-page", type=int, default=40)
+    parser.add_argument("--label-limit", type=int, default=300,
+                        help="label lessons only on pages with at most this many")
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    schedule = load_schedule(args.schedule)
+    start = time.perf_counter()
+    paths = render_schedule(schedule, args.output_dir, args.rows, args.facet, args.rows_per_page, args.label_limit,
+                            args.format, args.dpi)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(schedule)} lessons to {len(paths)} image(s) in {args.output_dir} in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
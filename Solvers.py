@@ -0,0 +1,418 @@
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from DataSchema import is_normalized, load_dataset, save_schedule, teacher_capacity, validate_dataset
+from RLModel import SchedulingTables
+
+
+class SchedulingProblem:
+    """Integer-indexed instance shared by the solvers.
+
+    Holds the id lists and the compiled SchedulingTables, so the solvers work
+    on the same indices and produce the same (teacher, student, room, time)
+    lesson tuples as SchedulingEnv. teacher_capacity is the same per-teacher
+    lesson limit the env enforces.
+    """
+
+    def __init__(self, teachers, students, rooms, times):
+        if not is_normalized(teachers, students):
+            teachers, students, rooms, times = validate_dataset(teachers, students, rooms, times)
+
+        self.teacher_ids = teachers["Teacher_ID"].tolist()
+        self.student_ids = students["Student_ID"].tolist()
+        self.room_ids = rooms["Room_ID"].tolist()
+        self.time_slots = times["Time Slot"].tolist()
+        self.tables = SchedulingTables(teachers, students)
+
+        self.num_teachers = len(self.teacher_ids)
+        self.num_students = len(self.student_ids)
+        self.num_rooms = len(self.room_ids)
+        self.num_slots = len(self.time_slots)
+        self.teacher_capacity = teacher_capacity(teachers, self.num_slots)
+
+        self.teacher_mapping = {tid: idx for idx, tid in enumerate(self.teacher_ids)}
+        self.student_mapping = {sid: idx for idx, sid in enumerate(self.student_ids)}
+        self.room_mapping = {rid: idx for idx, rid in enumerate(self.room_ids)}
+        self.slot_mapping = {str(slot): idx for idx, slot in enumerate(self.time_slots)}
+
+    @classmethod
+    def from_env(cls, env):
+        return cls(env.teachers, env.students, env.rooms, env.times)
+
+    def extend(self, teachers=None, students=None, rooms=None):
+        """Append normalized teacher and student rows and room rows after the existing indices.
+
+        An id that is already mapped (e.g. a retired teacher coming back) is
+        pointed at its new index. Follow with OccupancyState.grow.
+        """
+        if teachers is not None and len(teachers):
+            ids = teachers["Teacher_ID"].tolist()
+            self.teacher_mapping.update((tid, self.num_teachers + i) for i, tid in enumerate(ids))
+            self.teacher_ids += ids
+            self.num_teachers += len(ids)
+            self.teacher_capacity = np.concatenate((self.teacher_capacity, teacher_capacity(teachers, self.num_slots)))
+        if students is not None and len(students):
+            ids = students["Student_ID"].tolist()
+            self.student_mapping.update((sid, self.num_students + i) for i, sid in enumerate(ids))
+            self.student_ids += ids
+            self.num_students += len(ids)
+        if rooms is not None and len(rooms):
+            ids = rooms["Room_ID"].tolist()
+            self.room_mapping.update((rid, self.num_rooms + i) for i, rid in enumerate(ids))
+            self.room_ids += ids
+            self.num_rooms += len(ids)
+        self.tables.extend(
+            () if teachers is None else teachers["Instrument_Mask"].to_numpy(dtype=np.int64),
+            () if students is None else students["Instrument_Code"].to_numpy(dtype=np.int64),
+        )
+
+    def retire(self, teachers=(), students=()):
+        """Take teachers and students out of play without renumbering anyone.
+
+        Retired indices stay in the arrays but match no one, and retired
+        teachers have no capacity left, so no solver will use them again.
+        """
+        teachers, students = list(teachers), list(students)
+        self.tables.disable(teachers, students)
+        self.teacher_capacity[teachers] = 0
+
+    def lesson(self, teacher_idx, student_idx, room_idx, time_slot):
+        return (
+            self.teacher_ids[teacher_idx],
+            self.student_ids[student_idx],
+            self.room_ids[room_idx],
+            self.time_slots[time_slot],
+        )
+
+    def lesson_indices(self, lesson):
+        teacher_id, student_id, room_id, time = lesson
+        return (
+            self.teacher_mapping[teacher_id],
+            self.student_mapping[student_id],
+            self.room_mapping[room_id],
+            self.slot_mapping[str(time)],
+        )
+
+
+class OccupancyState:
+    """Occupancy grids for a (partial) schedule with one lesson per student.
+
+    Mirrors the SchedulingEnv grids and adds teacher/room load counters and a
+    teacher x slot occupant grid, so placing or removing a lesson and every
+    clash check is O(1). Busy cells without a lesson are blocked slots, see
+    block_teacher and block_room.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.teacher_busy = np.zeros((problem.num_teachers, problem.num_slots), dtype=bool)
+        self.room_busy = np.zeros((problem.num_rooms, problem.num_slots), dtype=bool)
+        self.room_free_count = np.full(problem.num_slots, problem.num_rooms, dtype=np.int64)
+        self.teacher_load = np.zeros(problem.num_teachers, dtype=np.int64)
+        self.room_load = np.zeros(problem.num_rooms, dtype=np.int64)
+        # occupant[t, slot] = student taught by teacher t in slot, or -1
+        self.occupant = np.full((problem.num_teachers, problem.num_slots), -1, dtype=np.int64)
+        # lesson_of[s] = (teacher, room, slot), or -1s when s is unscheduled
+        self.lesson_of = np.full((problem.num_students, 3), -1, dtype=np.int64)
+        self.num_scheduled = 0
+
+    @classmethod
+    def from_schedule(cls, problem, schedule):
+        """Build the state from lesson tuples, e.g. an RL rollout or a saved schedule."""
+        state = cls(problem)
+        for lesson in schedule:
+            teacher_idx, student_idx, room_idx, time_slot = problem.lesson_indices(lesson)
+            if state.is_scheduled(student_idx) or not state.can_place(teacher_idx, student_idx, room_idx, time_slot):
+                raise ValueError(f"Lesson {lesson} clashes with the rest of the schedule")
+            state.place(teacher_idx, student_idx, room_idx, time_slot)
+        return state
+
+    def is_scheduled(self, student_idx):
+        return self.lesson_of[student_idx, 0] >= 0
+
+    def can_place(self, teacher_idx, student_idx, room_idx, time_slot):
+        return bool(
+            self.problem.tables.compatible[student_idx, teacher_idx]
+            and self.teacher_load[teacher_idx] < self.problem.teacher_capacity[teacher_idx]
+            and not self.teacher_busy[teacher_idx, time_slot]
+            and not self.room_busy[room_idx, time_slot]
+        )
+
+    def block_teacher(self, teacher_idx, time_slot):
+        """Make a teacher unavailable in a slot without giving them a lesson there."""
+        self.teacher_busy[teacher_idx, time_slot] = True
+
+    def block_room(self, room_idx, time_slot):
+        """Close a room in a slot without putting a lesson in it."""
+        if not self.room_busy[room_idx, time_slot]:
+            self.room_busy[room_idx, time_slot] = True
+            self.room_free_count[time_slot] -= 1
+
+    def grow(self):
+        """Extend the grids to the problem's sizes after SchedulingProblem.extend; new entities start free."""
+        problem = self.problem
+        new_teachers = problem.num_teachers - len(self.teacher_load)
+        new_rooms = problem.num_rooms - len(self.room_load)
+        new_students = problem.num_students - len(self.lesson_of)
+        if new_teachers:
+            self.teacher_busy = np.vstack((self.teacher_busy, np.zeros((new_teachers, problem.num_slots), bool)))
+            self.occupant = np.vstack((self.occupant, np.full((new_teachers, problem.num_slots), -1, np.int64)))
+            self.teacher_load = np.concatenate((self.teacher_load, np.zeros(new_teachers, np.int64)))
+        if new_rooms:
+            self.room_busy = np.vstack((self.room_busy, np.zeros((new_rooms, problem.num_slots), bool)))
+            self.room_load = np.concatenate((self.room_load, np.zeros(new_rooms, np.int64)))
+            self.room_free_count += new_rooms
+        if new_students:
+            self.lesson_of = np.vstack((self.lesson_of, np.full((new_students, 3), -1, np.int64)))
+
+    def free_room(self, time_slot):
+        """Index of a free room in time_slot, or -1."""
+        if self.room_free_count[time_slot] == 0:
+            return -1
+        return int(np.argmin(self.room_busy[:, time_slot]))
+
+    def place(self, teacher_idx, student_idx, room_idx, time_slot):
+        self.teacher_busy[teacher_idx, time_slot] = True
+        self.room_busy[room_idx, time_slot] = True
+        self.room_free_count[time_slot] -= 1
+        self.teacher_load[teacher_idx] += 1
+        self.room_load[room_idx] += 1
+        self.occupant[teacher_idx, time_slot] = student_idx
+        self.lesson_of[student_idx] = (teacher_idx, room_idx, time_slot)
+        self.num_scheduled += 1
+
+    def place_many(self, teachers, students, rooms, slots):
+        """place() for index arrays of lessons that are known not to clash with each other or the state."""
+        self.teacher_busy[teachers, slots] = True
+        self.room_busy[rooms, slots] = True
+        np.subtract.at(self.room_free_count, slots, 1)
+        np.add.at(self.teacher_load, teachers, 1)
+        np.add.at(self.room_load, rooms, 1)
+        self.occupant[teachers, slots] = students
+        self.lesson_of[students] = np.column_stack((teachers, rooms, slots))
+        self.num_scheduled += len(students)
+
+    def remove(self, student_idx):
+        teacher_idx, room_idx, time_slot = self.lesson_of[student_idx]
+        self.teacher_busy[teacher_idx, time_slot] = False
+        self.room_busy[room_idx, time_slot] = False
+        self.room_free_count[time_slot] += 1
+        self.teacher_load[teacher_idx] -= 1
+        self.room_load[room_idx] -= 1
+        self.occupant[teacher_idx, time_slot] = -1
+        self.lesson_of[student_idx] = -1
+        self.num_scheduled -= 1
+        return teacher_idx, room_idx, time_slot
+
+    def coverage(self):
+        return self.num_scheduled / self.problem.num_students
+
+    def to_schedule(self):
+        """Lesson tuples in student order."""
+        return [
+            self.problem.lesson(teacher_idx, student_idx, room_idx, time_slot)
+            for student_idx, (teacher_idx, room_idx, time_slot) in enumerate(self.lesson_of)
+            if teacher_idx >= 0
+        ]
+
+
+def _pending_students(state, students):
+    if students is None:
+        return np.flatnonzero(state.lesson_of[:, 0] < 0)
+    return np.array([s for s in students if not state.is_scheduled(s)], dtype=np.int64)
+
+
+def solve_greedy(problem, state=None, students=None):
+    """Greedy bipartite assignment of students to teacher x room x slot.
+
+    Students with the fewest compatible teachers go first. Each is given the
+    least loaded compatible teacher under their workload limit that still
+    has a slot with a free room,
+    using the teacher's earliest such slot. A per-teacher slot pointer only
+    moves forward, so the whole pass is O(students x teachers + teachers x slots).
+
+    state can carry lessons that must stay fixed; only `students` (default:
+    every unscheduled student) are placed. Returns the filled OccupancyState.
+    """
+    state = state or OccupancyState(problem)
+    compatible = problem.tables.compatible
+    pending = _pending_students(state, students)
+    order = pending[np.argsort(compatible[pending].sum(axis=1), kind="stable")]
+
+    next_slot = np.zeros(problem.num_teachers, dtype=np.int64)
+    exhausted = state.teacher_load >= problem.teacher_capacity
+    masked_load = np.iinfo(np.int64).max
+
+    for student_idx in order:
+        candidates = compatible[student_idx] & ~exhausted
+        while candidates.any():
+            teacher_idx = int(np.argmin(np.where(candidates, state.teacher_load, masked_load)))
+
+            # Skip slots where the teacher is busy or every room is taken;
+            # neither ever frees up during the pass. The pointer's own slot is
+            # usually open, otherwise the rest of the row is scanned at once.
+            slot = next_slot[teacher_idx]
+            if slot < problem.num_slots and (state.teacher_busy[teacher_idx, slot] or
+                                             state.room_free_count[slot] == 0):
+                open_slots = ~state.teacher_busy[teacher_idx, slot:] & (state.room_free_count[slot:] > 0)
+                slot += int(np.argmax(open_slots)) if open_slots.any() else len(open_slots)
+            next_slot[teacher_idx] = slot
+
+            if slot == problem.num_slots:
+                exhausted[teacher_idx] = True
+                candidates[teacher_idx] = False
+                continue
+
+            state.place(teacher_idx, student_idx, state.free_room(slot), slot)
+            exhausted[teacher_idx] = state.teacher_load[teacher_idx] >= problem.teacher_capacity[teacher_idx]
+            break
+
+    return state
+
+
+class _FlowGraph:
+    """Dinic max flow on adjacency lists of [to, capacity, reverse edge index]."""
+
+    def __init__(self, num_nodes):
+        self.edges = [[] for _ in range(num_nodes)]
+
+    def add_edge(self, u, v, capacity):
+        self.edges[u].append([v, capacity, len(self.edges[v])])
+        self.edges[v].append([u, 0, len(self.edges[u]) - 1])
+
+    def _levels(self, source, sink):
+        level = [-1] * len(self.edges)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v, capacity, _ in self.edges[u]:
+                if capacity > 0 and level[v] < 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level if level[sink] >= 0 else None
+
+    def _augment(self, u, sink, pushed, level, cursor):
+        if u == sink:
+            return pushed
+        edges = self.edges[u]
+        while cursor[u] < len(edges):
+            edge = edges[cursor[u]]
+            v, capacity, rev = edge
+            if capacity > 0 and level[v] == level[u] + 1:
+                flow = self._augment(v, sink, min(pushed, capacity), level, cursor)
+                if flow:
+                    edge[1] -= flow
+                    self.edges[v][rev][1] += flow
+                    return flow
+            cursor[u] += 1
+        return 0
+
+    def max_flow(self, source, sink):
+        total = 0
+        while True:
+            level = self._levels(source, sink)
+            if level is None:
+                return total
+            cursor = [0] * len(self.edges)
+            while True:
+                flow = self._augment(source, sink, float("inf"), level, cursor)
+                if not flow:
+                    break
+                total += flow
+
+
+def solve_exact(problem, state=None, students=None):
+    """Maximum-coverage schedule via max flow, for small instances.
+
+    With one lesson per student the problem is a flow network:
+    source -> student (1) -> compatible teacher (1) -> teacher workload
+    (remaining capacity) -> free teacher slot (1) -> slot (free rooms)
+    -> sink. The max flow is the optimal number of scheduled students, which
+    makes this the reference the RL policy and the greedy solver are measured
+    against. Rooms are interchangeable within a
+    slot, so they are handed out after the flow is found.
+
+    Same state/students contract as solve_greedy. Builds teachers x slots
+    edges in pure Python, so keep it to instances of a few hundred students.
+    """
+    state = state or OccupancyState(problem)
+    compatible = problem.tables.compatible
+    pending = _pending_students(state, students)
+
+    num_pending = len(pending)
+    capacity_base = 1 + num_pending
+    teacher_base = capacity_base + problem.num_teachers
+    slot_base = teacher_base + problem.num_teachers
+    sink = slot_base + problem.num_slots
+    graph = _FlowGraph(sink + 1)
+
+    for position, student_idx in enumerate(pending):
+        graph.add_edge(0, 1 + position, 1)
+        for teacher_idx in np.flatnonzero(compatible[student_idx]):
+            graph.add_edge(1 + position, capacity_base + teacher_idx, 1)
+    remaining = problem.teacher_capacity - state.teacher_load
+    for teacher_idx in np.flatnonzero(remaining > 0):
+        graph.add_edge(capacity_base + teacher_idx, teacher_base + teacher_idx, int(remaining[teacher_idx]))
+    for teacher_idx in range(problem.num_teachers):
+        for slot in np.flatnonzero(~state.teacher_busy[teacher_idx] & (state.room_free_count > 0)):
+            graph.add_edge(teacher_base + teacher_idx, slot_base + slot, 1)
+    for slot in np.flatnonzero(state.room_free_count > 0):
+        graph.add_edge(slot_base + slot, sink, int(state.room_free_count[slot]))
+
+    graph.max_flow(0, sink)
+
+    # Decompose the flow: pair each teacher's incoming students with the
+    # slots the teacher sends flow to.
+    for teacher_idx in range(problem.num_teachers):
+        node = teacher_base + teacher_idx
+        assigned_students = [
+            pending[v - 1] for v, capacity, _ in graph.edges[capacity_base + teacher_idx]
+            if 1 <= v < capacity_base and capacity == 1
+        ]
+        assigned_slots = [
+            v - slot_base for v, capacity, _ in graph.edges[node]
+            if slot_base <= v < sink and capacity == 0
+        ]
+        for student_idx, slot in zip(assigned_students, assigned_slots):
+            state.place(teacher_idx, student_idx, state.free_room(slot), slot)
+
+    return state
+
+
+SOLVERS = {
+    "greedy": solve_greedy,
+    "exact": solve_exact,
+}
+
+
+def solve(teachers, students, rooms, times, mode="greedy"):
+    """Schedule an instance from DataFrames and return the lesson tuples."""
+    problem = SchedulingProblem(teachers, students, rooms, times)
+    return SOLVERS[mode](problem).to_schedule()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Schedule an instance with a heuristic or exact solver.")
+    parser.add_argument("--mode", choices=sorted(SOLVERS), default="greedy")
+    parser.add_argument("--suffix", default="", help="dataset file suffix, e.g. _test")
+    parser.add_argument("--output", default="generated_schedule.csv")
+    args = parser.parse_args(argv)
+
+    paths = tuple(f"{name}{args.suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    problem = SchedulingProblem(*load_dataset(paths))
+
+    start = time.perf_counter()
+    state = SOLVERS[args.mode](problem)
+    elapsed = time.perf_counter() - start
+
+    save_schedule(state.to_schedule(), args.output)
+    print(f"{args.mode}: scheduled {state.num_scheduled} / {problem.num_students} students "
+          f"({state.coverage():.1%}) in {elapsed * 1000:.1f} ms, saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
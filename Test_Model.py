@@ -1,22 +1,24 @@
-﻿import pandas as pd
-from stable_baselines3 import PPO
-
-import config
+﻿import config
+from DataSchema import load_dataset, save_schedule
+from LocalSearch import print_report, repair_schedule
+from NumpyPolicy import load_policy
 from RLModel import SchedulingEnv
+from Solvers import SchedulingProblem
 
 
-def test_model():
+def test_model(use_masking=config.USE_ACTION_MASKING, suffix="_test"):
+    # The held-out dataset from DatasetGenerator's "test" mode; use
+    # Evaluation.py for seeded comparisons over many instances
     print("Loading test datasets...")
-    teachers = pd.read_csv("teachers.csv")
-    students = pd.read_csv("students.csv")
-    rooms = pd.read_csv("rooms.csv")
-    times = pd.read_csv("times.csv")
+    teachers, students, rooms, times = load_dataset(
+        tuple(f"{name}{suffix}.csv" for name in ("teachers", "students", "rooms", "times"))
+    )
 
     print("Initializing test environment...")
-    test_env = SchedulingEnv(teachers, students, rooms, times)
+    test_env = SchedulingEnv(teachers, students, rooms, times, pad_to=config.PAD_TO)
 
     print("Loading trained model...")
-    model = PPO.load("scheduling_rl_model")
+    model = load_policy(config.INFERENCE_MODEL, use_masking)
 
     obs, _ = test_env.reset()
     schedule = []
@@ -24,16 +26,13 @@ def test_model():
     print("Generating schedule...")
     done = False
 
+    # Padded indices are penalised as invalid actions by the env and its
+    # max_steps ends the episode, so every iteration advances it.
     while not done:
-        action, _ = model.predict(obs, deterministic=False)
-
-        teacher_idx, room_idx, time_slot = action
-
-        if teacher_idx >= config.MAX_TEACHERS or room_idx >= config.MAX_ROOMS:
-            print("⚠️ Out of bounds, skipping action\n"
-                  f"Teacher Index: {teacher_idx}"
-                  f"Room Index: {room_idx}")
-            continue
+        if use_masking:
+            action, _ = model.predict(obs, deterministic=False, action_masks=test_env.action_masks())
+        else:
+            action, _ = model.predict(obs, deterministic=False)
 
         decoded = test_env.decode_action(action)
         print("Decoded action:", decoded)
@@ -59,12 +58,19 @@ def test_model():
 
     if schedule:
         print(schedule)
-        pd.DataFrame(schedule).to_csv("generated_schedule.csv", index=False)
+        save_schedule(schedule, "generated_schedule.csv")
         print("Schedule saved to generated_schedule.csv")
     else:
         print("No valid schedule was generated. Current schedule:")
         print(schedule)
 
+    if config.REPAIR_TIME_BUDGET > 0:
+        print("\nRepairing schedule with local search...")
+        repaired, report = repair_schedule(SchedulingProblem.from_env(test_env), schedule, config.REPAIR_TIME_BUDGET)
+        print_report(report)
+        save_schedule(repaired, "repaired_schedule.csv")
+        print("Repaired schedule saved to repaired_schedule.csv")
+
 
 if __name__ == '__main__':
     test_model()
@@ -1,10 +1,11 @@
-﻿import pandas as pd
-import matplotlib.pyplot as plt
+﻿import matplotlib.pyplot as plt
+
+from TrainingLogger import load_training_log
 
 
 def main(filename):
     # Load the log file
-    data = pd.read_csv(filename)
+    data = load_training_log(filename)
 
     plt.figure(figsize=(15, 10))
 
@@ -64,10 +65,10 @@ def main(filename):
     plt.savefig("training_plots.png")
 
 if __name__ == '__main__':
-    fileNameOption = input("Enter 1 for training_logs.csv and 2 for hyper_paramater_training_logs.csv")
+    fileNameOption = input("Enter 1 for training_logs.arrow and 2 for hyper_paramater_training_logs.arrow")
     if fileNameOption == "1":
-        main("training_logs.csv")
+        main("training_logs.arrow")
     elif fileNameOption == "2":
-        main("hyper_paramater_training_logs.csv")
+        main("hyper_paramater_training_logs.arrow")
     else:
         print("Invalid file option")
@@ -1,49 +1,349 @@
-﻿from stable_baselines3.common.callbacks import BaseCallback
+﻿import cProfile
+import os
+import time
+
+from stable_baselines3.common.callbacks import BaseCallback
 import numpy as np
 import pandas as pd
 
+from Profiling import PhaseTimer, format_report
+
+LOG_COLUMNS = [
+    "timesteps",
+    "reward_mean",
+    "episode_length_mean",
+    "coverage_mean",
+    "value_loss",
+    "policy_loss",
+    "explained_variance",
+    "entropy_loss",
+]
+
+# SB3 logger keys for the per-update training metrics
+TRAIN_METRICS = {
+    "value_loss": "train/value_loss",
+    "policy_loss": "train/policy_gradient_loss",
+    "explained_variance": "train/explained_variance",
+    "entropy_loss": "train/entropy_loss",
+}
+
+
+class RunningWindow:
+    """Mean of the last `size` values, kept in a ring buffer with a running sum."""
+
+    def __init__(self, size=10):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+
+    def append(self, value):
+        idx = self.count % len(self.values)
+        if self.count >= len(self.values):
+            self.total -= self.values[idx]
+        self.values[idx] = value
+        self.total += value
+        self.count += 1
+
+    def mean(self):
+        if self.count == 0:
+            return np.nan
+        return self.total / min(self.count, len(self.values))
+
+
+class RunningStats:
+    """Streaming count/mean/variance (Welford) that skips NaN like pandas."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        if np.isnan(value):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        if self.count < 2:
+            return np.nan
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+
+class LogWriter:
+    """Append-only chunked writer for the training log.
+
+    ".arrow" paths are written as an Arrow IPC stream (needs pyarrow), one
+    record batch per chunk; anything else is appended to as CSV. Both formats
+    can be read back up to the last flushed chunk if the process dies.
+    """
+
+    def __init__(self, path, keep_rows=0):
+        self.path = path
+        self.arrow = str(path).endswith(".arrow")
+        self._sink = None
+        self._writer = None
+        self._header_written = False
+
+        # Resuming: keep the rows logged up to the checkpoint, drop the rest
+        kept = None
+        if keep_rows and os.path.exists(path):
+            kept = load_training_log(path).iloc[:keep_rows]
+
+        if self.arrow:
+            # pyarrow is only needed for the columnar format
+            import pyarrow as pa
+            self._pa = pa
+            self._schema = pa.schema([(name, pa.float64()) for name in LOG_COLUMNS])
+            self._sink = open(path, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        if kept is not None and len(kept):
+            self.write({name: kept[name].to_numpy(dtype=np.float64) for name in LOG_COLUMNS})
+
+    def write(self, columns):
+        if self.arrow:
+            batch = self._pa.record_batch([columns[name] for name in LOG_COLUMNS], schema=self._schema)
+            self._writer.write_batch(batch)
+            self._sink.flush()
+        else:
+            pd.DataFrame(columns, columns=LOG_COLUMNS).to_csv(
+                self.path, mode="a", header=not self._header_written, index=False
+            )
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+
+
+def load_training_log(path):
+    """Read a training log written by TrainingLoggerCallback into a DataFrame.
+
+    Arrow logs cut short by a crash are read up to the last complete chunk.
+    """
+    if not str(path).endswith(".arrow"):
+        return pd.read_csv(path)
+
+    import pyarrow as pa
+    batches = []
+    with open(path, "rb") as source:
+        try:
+            reader = pa.ipc.open_stream(source)
+            for batch in reader:
+                batches.append(batch)
+        except (pa.ArrowInvalid, OSError):
+            pass
+    if not batches:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    return pa.Table.from_batches(batches).to_pandas()
+
+
 # Custom Callback to Log Training Data
 class TrainingLoggerCallback(BaseCallback):
-    def __init__(self, log_dir="training_logs.csv", verbose=1):
+    """Streams training metrics to disk in constant memory.
+
+    A row is sampled every `log_interval` env steps, episode statistics are
+    running means over the last `window` finished episodes, and rows are
+    buffered in preallocated columns and appended to `log_dir` every
+    `flush_every` rows. Use a ".arrow" path for a columnar log.
+    state_dict()/load_state_dict() carry the running statistics across a
+    checkpoint restart (see Checkpointing).
+
+    profile=True times the callback itself, rollout collection and the
+    optimisation epochs between rollouts, and phase_report() merges these
+    with the env-side timers of envs built with profile=True. cprofile_path
+    dumps a cProfile of the first `cprofile_steps` steps (or the whole run)
+    for offline inspection, e.g. with snakeviz; SubprocVecEnv workers run in
+    other processes and only show up as IPC waits.
+    """
+
+    def __init__(self, log_dir="training_logs.csv", verbose=1, log_interval=1, window=10, flush_every=1000,
+                 profile=False, cprofile_path=None, cprofile_steps=None):
         super(TrainingLoggerCallback, self).__init__(verbose)
         self.log_dir = log_dir
-        self.training_data = []
-        self.episode_rewards = []
-        self.episode_lengths = []
-        self.current_episode_reward = 0
-        self.current_episode_length = 0
+        self.log_interval = log_interval
+        self.flush_every = flush_every
+        self.episode_rewards = RunningWindow(window)
+        self.episode_lengths = RunningWindow(window)
+        self.episode_coverages = RunningWindow(window)
+        self.current_episode_reward = None
+        self.current_episode_length = None
+        # First timestep at which an episode scheduled every student
+        self.full_coverage_timestep = None
+
+        # Latest PPO update metrics, refreshed once per rollout rather than per step
+        self.train_metrics = {name: np.nan for name in TRAIN_METRICS}
+        self.train_stats = {name: RunningStats() for name in TRAIN_METRICS}
+        self.latest = {name: np.nan for name in LOG_COLUMNS}
+
+        self._chunk = {name: np.zeros(flush_every, dtype=np.float64) for name in LOG_COLUMNS}
+        self._chunk_rows = 0
+        self.rows_written = 0
+        self._writer = None
+        self._resume_rows = 0
+
+        # Opt-in instrumentation (see Profiling)
+        self.phase_timer = None
+        self.cprofile_path = cprofile_path
+        self.cprofile_steps = cprofile_steps
+        self._profiler = None
+        self._rollout_start = None
+        self._rollout_end = None
+        if profile:
+            self.phase_timer = PhaseTimer()
+            self._on_step = self.phase_timer.wrap("callback", self._on_step)
+
+    def _on_training_start(self):
+        num_envs = self.training_env.num_envs
+        self.current_episode_reward = np.zeros(num_envs, dtype=np.float64)
+        self.current_episode_length = np.zeros(num_envs, dtype=np.int64)
+        self._writer = LogWriter(self.log_dir, keep_rows=self._resume_rows)
+        if self.cprofile_path is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _on_rollout_start(self):
+        # The previous rollout has just been followed by a PPO update
+        name_to_value = self.model.logger.name_to_value
+        for name, key in TRAIN_METRICS.items():
+            self.train_metrics[name] = name_to_value.get(key, np.nan)
+
+        if self.phase_timer is not None:
+            self._rollout_start = time.perf_counter()
+            if self._rollout_end is not None:
+                self.phase_timer.add("optimization", self._rollout_start - self._rollout_end)
+
+    def _on_rollout_end(self):
+        if self.phase_timer is not None:
+            self._rollout_end = time.perf_counter()
+            self.phase_timer.add("rollout", self._rollout_end - self._rollout_start)
 
     def _on_step(self) -> bool:
         # Get rewards and episode end signals
         rewards = self.locals["rewards"]
         dones = self.locals["dones"]
 
-        # Track episode rewards and lengths
-        self.current_episode_reward += np.sum(rewards)
+        # Track episode rewards and lengths per env
+        self.current_episode_reward += rewards
         self.current_episode_length += 1
 
-        if np.any(dones):  # If any environment finished an episode
-            self.episode_rewards.append(self.current_episode_reward)
-            self.episode_lengths.append(self.current_episode_length)
-            self.current_episode_reward = 0
-            self.current_episode_length = 0
-
-        # Collect relevant training metrics
-        metrics = {
-            "timesteps": self.num_timesteps,
-            "reward_mean": np.mean(self.episode_rewards[-10:]),  # Last 10 episodes
-            "episode_length_mean": np.mean(self.episode_lengths[-10:]),  # Last 10 episodes
-            "value_loss": self.model.logger.name_to_value.get("train/value_loss", np.nan),
-            "policy_loss": self.model.logger.name_to_value.get("train/policy_gradient_loss", np.nan),
-            "explained_variance": self.model.logger.name_to_value.get("train/explained_variance", np.nan),
-            "entropy_loss": self.model.logger.name_to_value.get("train/entropy_loss", np.nan),
-        }
+        if dones.any():  # If any environment finished an episode
+            infos = self.locals.get("infos", [])
+            for env_idx in np.flatnonzero(dones):
+                coverage = infos[env_idx].get("coverage", 0.0) if infos else np.nan
+                self.episode_rewards.append(self.current_episode_reward[env_idx])
+                self.episode_lengths.append(self.current_episode_length[env_idx])
+                self.episode_coverages.append(coverage)
+                if coverage >= 1.0 and self.full_coverage_timestep is None:
+                    self.full_coverage_timestep = self.num_timesteps
+            self.current_episode_reward[dones] = 0
+            self.current_episode_length[dones] = 0
 
-        self.training_data.append(metrics)
+        if self.n_calls % self.log_interval == 0:
+            self._log_row()
+
+        if self._profiler is not None and self.cprofile_steps is not None and self.n_calls >= self.cprofile_steps:
+            self._stop_profiler()
         return True  # Continue training
 
+    def _log_row(self):
+        row = self.latest
+        row["timesteps"] = self.num_timesteps
+        row["reward_mean"] = self.episode_rewards.mean()
+        row["episode_length_mean"] = self.episode_lengths.mean()
+        row["coverage_mean"] = self.episode_coverages.mean()
+        for name, value in self.train_metrics.items():
+            row[name] = value
+            self.train_stats[name].update(value)
+
+        for name in LOG_COLUMNS:
+            self._chunk[name][self._chunk_rows] = row[name]
+        self._chunk_rows += 1
+        if self._chunk_rows == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._chunk_rows == 0 or self._writer is None:
+            return
+        self._writer.write({name: values[:self._chunk_rows] for name, values in self._chunk.items()})
+        self.rows_written += self._chunk_rows
+        self._chunk_rows = 0
+
+    def _stop_profiler(self):
+        self._profiler.disable()
+        self._profiler.dump_stats(self.cprofile_path)
+        self._profiler = None
+        if self.verbose >= 1:
+            print(f"cProfile of {self.n_calls} steps saved to {self.cprofile_path}")
+
+    def phase_report(self):
+        """Per-phase wall time from this callback and every profiled env."""
+        timer = PhaseTimer()
+        if self.phase_timer is not None:
+            timer.merge(self.phase_timer)
+
+        try:
+            env_timers = self.training_env.get_attr("phase_timer")
+        except AttributeError:
+            env_timers = []
+        # BatchedSchedulingEnv returns the same timer for every env
+        seen = set()
+        for env_timer in env_timers:
+            if env_timer is not None and id(env_timer) not in seen:
+                seen.add(id(env_timer))
+                timer.merge(env_timer)
+        return timer.report()
+
+    def state_dict(self):
+        """Running statistics and log position, flushing buffered rows first."""
+        self.flush()
+        return {
+            "rows_written": self.rows_written,
+            "episode_rewards": self.episode_rewards,
+            "episode_lengths": self.episode_lengths,
+            "episode_coverages": self.episode_coverages,
+            "full_coverage_timestep": self.full_coverage_timestep,
+            "train_metrics": self.train_metrics,
+            "train_stats": self.train_stats,
+            "latest": self.latest,
+        }
+
+    def load_state_dict(self, state):
+        """Continue from state_dict(); call before training starts."""
+        self.rows_written = self._resume_rows = state["rows_written"]
+        self.episode_rewards = state["episode_rewards"]
+        self.episode_lengths = state["episode_lengths"]
+        self.episode_coverages = state["episode_coverages"]
+        self.full_coverage_timestep = state["full_coverage_timestep"]
+        self.train_metrics = state["train_metrics"]
+        self.train_stats = state["train_stats"]
+        self.latest = state["latest"]
+
+    def summary(self):
+        """Latest logged values plus the std of the logged update losses."""
+        summary = dict(self.latest)
+        summary["value_loss_std"] = self.train_stats["value_loss"].std()
+        summary["policy_loss_std"] = self.train_stats["policy_loss"].std()
+        return summary
+
     def _on_training_end(self):
-        # Save collected data to CSV
-        df = pd.DataFrame(self.training_data)
-        df.to_csv(self.log_dir, index=False)
-        print(f"Training log saved to {self.log_dir}")
\ No newline at end of file
+        if self.phase_timer is not None and self._rollout_end is not None:
+            self.phase_timer.add("optimization", time.perf_counter() - self._rollout_end)
+        if self._profiler is not None:
+            self._stop_profiler()
+
+        self.flush()
+        self._writer.close()
+        if self.verbose >= 1:
+            print(f"Training log saved to {self.log_dir} ({self.rows_written} rows)")
+            if self.full_coverage_timestep is not None:
+                print(f"Full coverage first reached at timestep {self.full_coverage_timestep}")
+            if self.phase_timer is not None:
+                print(format_report(self.phase_report()))
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""Parity check and throughput of BatchedSchedulingEnv.
+
+Run from the repository root:
+
+    python benchmarks/batched_env_benchmark.py --envs 64 --steps 200000
+
+First steps BatchedSchedulingEnv and a DummyVecEnv of SchedulingEnv copies
+with identical random actions and fails if any observation, action mask,
+reward, done or info differs, then reports steps/s for both. Both run
+without and with Max_Hours_Per_Week teacher workload limits.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, SLOT_HOURS, TIME_SLOTS
+from BatchedRLModel import BatchedSchedulingEnv
+from RLModel import SchedulingEnv
+from env_step_benchmark import build_instance
+
+
+def random_actions(env, steps, seed):
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    return rng.integers(0, nvec, size=(steps, env.num_envs, len(nvec)))
+
+
+def check_parity(batched, reference, steps, seed):
+    obs_a, obs_b = batched.reset(), reference.reset()
+    assert np.array_equal(obs_a, obs_b), "reset observations differ"
+    for step, actions in enumerate(random_actions(batched, steps, seed)):
+        masks_b = np.stack(reference.env_method("action_masks"))
+        assert np.array_equal(batched.action_masks(), masks_b), f"action masks differ at step {step}"
+        obs_a, rew_a, done_a, infos_a = batched.step(actions)
+        obs_b, rew_b, done_b, infos_b = reference.step(actions)
+        assert np.array_equal(obs_a, obs_b), f"observations differ at step {step}"
+        assert np.array_equal(rew_a, rew_b), f"rewards differ at step {step}"
+        assert np.array_equal(done_a, done_b), f"dones differ at step {step}"
+        for info_a, info_b in zip(infos_a, infos_b):
+            assert info_a.keys() == info_b.keys(), f"info keys differ at step {step}"
+            for key in info_a:
+                assert np.array_equal(info_a[key], info_b[key]), f"info['{key}'] differs at step {step}"
+
+
+def measure(env, steps, seed):
+    actions = random_actions(env, steps // env.num_envs, seed)
+    env.reset()
+    start = time.perf_counter()
+    for batch in actions:
+        env.step(batch)
+    return actions.shape[0] * env.num_envs / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--steps", type=int, default=200000)
+    parser.add_argument("--parity-steps", type=int, default=2000)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for label, max_hours in (("unconstrained", False), ("workload limits", True)):
+        data = build_instance(MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS, args.seed, max_hours=max_hours)
+        if max_hours:
+            # Two lessons per teacher, so the limits bind within an episode
+            # and the at-capacity masks and observations are compared too
+            teachers, *rest = data
+            teachers = teachers.assign(Max_Hours_Per_Week=2 * SLOT_HOURS)
+            data = (teachers, *rest)
+        batched = BatchedSchedulingEnv(*data, num_envs=args.envs, max_steps=args.max_steps)
+        reference = DummyVecEnv([lambda: SchedulingEnv(*data, max_steps=args.max_steps)] * args.envs)
+
+        check_parity(batched, reference, args.parity_steps, args.seed)
+        batched_rate = measure(batched, args.steps, args.seed)
+        reference_rate = measure(reference, args.steps, args.seed)
+
+        print(f"{label}: parity ok over {args.parity_steps} steps x {args.envs} envs")
+        print(f"  BatchedSchedulingEnv: {batched_rate:,.0f} env steps/s")
+        print(f"  DummyVecEnv x {args.envs}: {reference_rate:,.0f} env steps/s")
+
+
+if __name__ == '__main__':
+    main()
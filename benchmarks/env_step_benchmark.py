@@ -0,0 +1,67 @@
+"""Microbenchmark for SchedulingEnv.step throughput.
+
+Run from the repository root:
+
+    python benchmarks/env_step_benchmark.py --steps 20000
+
+Generates an in-memory instance of the requested size, drives the env with
+seeded random actions and reports steps per second, both without and with
+Max_Hours_Per_Week teacher workload limits.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS
+from DatasetGenerator import generate_dataset
+from RLModel import SchedulingEnv
+
+
+def build_instance(num_teachers, num_students, num_rooms, num_slots, seed=0, max_hours=False):
+    return generate_dataset(num_teachers, num_students, num_rooms, num_slots, seed=seed, max_hours=max_hours)
+
+
+def run(env, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    actions = np.stack([
+        rng.integers(0, len(env.teacher_ids), steps),
+        rng.integers(0, len(env.room_ids), steps),
+        rng.integers(0, len(env.time_slots), steps),
+    ], axis=1)
+
+    env.reset()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, done, _, _ = env.step(action)
+        if done:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    return steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--teachers", type=int, default=MAX_TEACHERS)
+    parser.add_argument("--students", type=int, default=MAX_STUDENTS)
+    parser.add_argument("--rooms", type=int, default=MAX_ROOMS)
+    parser.add_argument("--slots", type=int, default=TIME_SLOTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-copy-obs", action="store_true", help="return the env's observation buffer uncopied")
+    args = parser.parse_args()
+
+    print(f"{args.teachers} teachers, {args.students} students, {args.rooms} rooms, {args.slots} slots")
+    for label, max_hours in (("unconstrained", False), ("workload limits", True)):
+        env = SchedulingEnv(*build_instance(args.teachers, args.students, args.rooms, args.slots, args.seed,
+                                            max_hours=max_hours), copy_obs=not args.no_copy_obs)
+        steps_per_sec = run(env, args.steps, args.seed)
+        print(f"  {label}: {steps_per_sec:,.0f} steps/s")
+
+
+if __name__ == '__main__':
+    main()
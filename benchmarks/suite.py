@@ -0,0 +1,238 @@
+"""Benchmark suite for env, PPO rollout and inference throughput.
+
+Run from the repository root:
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --output bench.json --baseline baseline.json
+    python benchmarks/suite.py --results bench.json --baseline baseline.json
+
+Instances of several sizes come from DatasetGenerator. For each size the
+suite records SchedulingEnv reset/step/get_obs latency percentiles, PPO
+rollout fps for each --n-envs count and Test_Model-style inference
+throughput with an untrained policy. Everything runs on the CPU without
+network access. Results are written as flat JSON metrics. Given a
+--baseline, every metric is compared against it and the script exits with
+status 1 if any regressed by more than --tolerance.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS
+from DatasetGenerator import generate_dataset
+from EnvFactory import make_scheduling_vec_env
+from RLModel import SchedulingEnv, get_algorithm
+
+# (teachers, students, rooms, slots) per instance size
+SIZES = {
+    "small": (MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS),
+    "medium": (30, 500, 20, 200),
+    "large": (100, 5000, 50, 1000),
+}
+
+# Metric name suffix -> whether a larger value is better
+METRIC_DIRECTIONS = {
+    "_us": False,
+    "_per_sec": True,
+}
+
+
+def latency_summary(samples_ns, prefix):
+    """p50/p90/p99/mean of per-call timings, in microseconds."""
+    samples_us = np.asarray(samples_ns, dtype=np.float64) / 1e3
+    p50, p90, p99 = np.percentile(samples_us, [50, 90, 99])
+    return {
+        f"{prefix}.p50_us": float(p50),
+        f"{prefix}.p90_us": float(p90),
+        f"{prefix}.p99_us": float(p99),
+        f"{prefix}.mean_us": float(samples_us.mean()),
+    }
+
+
+def bench_env(data, steps, resets, seed=0):
+    """Latency distributions of SchedulingEnv.reset, step and get_obs."""
+    env = SchedulingEnv(*data, max_steps=steps + 1)
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, env.action_space.nvec, size=(steps, len(env.action_space.nvec)))
+    clock = time.perf_counter_ns
+
+    reset_times = np.empty(resets, dtype=np.int64)
+    for i in range(resets):
+        start = clock()
+        env.reset()
+        reset_times[i] = clock() - start
+
+    step_times = np.empty(steps, dtype=np.int64)
+    env.reset()
+    for i, action in enumerate(actions):
+        start = clock()
+        _, _, done, _, _ = env.step(action)
+        step_times[i] = clock() - start
+        if done:
+            env.reset()
+
+    obs_times = np.empty(steps, dtype=np.int64)
+    for i in range(steps):
+        start = clock()
+        env.get_obs()
+        obs_times[i] = clock() - start
+
+    metrics = {}
+    metrics.update(latency_summary(reset_times, "env.reset"))
+    metrics.update(latency_summary(step_times, "env.step"))
+    metrics.update(latency_summary(obs_times, "env.get_obs"))
+    metrics["env.step.steps_per_sec"] = steps / (step_times.sum() / 1e9)
+    return metrics
+
+
+def bench_rollout(data, n_envs, n_steps, vectorization, seed=0):
+    """PPO rollout collection fps (env steps/s), excluding the gradient update."""
+    env = make_scheduling_vec_env(*data, n_envs=n_envs, vectorization=vectorization, seed=seed)
+    model = get_algorithm()("MlpPolicy", env, n_steps=n_steps, batch_size=n_steps, seed=seed, device="cpu",
+                            verbose=0)
+    _, callback = model._setup_learn(n_steps * n_envs)
+    callback.on_training_start(locals(), globals())
+
+    start = time.perf_counter()
+    model.collect_rollouts(model.env, callback, model.rollout_buffer, n_rollout_steps=n_steps)
+    elapsed = time.perf_counter() - start
+    env.close()
+    return {f"ppo.rollout.n_envs_{n_envs}.steps_per_sec": n_steps * n_envs / elapsed}
+
+
+def bench_inference(data, episodes, max_steps, seed=0):
+    """Test_Model-style loop: one env, model.predict then env.step until done."""
+    env = SchedulingEnv(*data, max_steps=max_steps)
+    model = get_algorithm()("MlpPolicy", env, seed=seed, device="cpu", verbose=0)
+
+    steps = 0
+    start = time.perf_counter()
+    for episode in range(episodes):
+        obs, _ = env.reset(seed=seed + episode)
+        done = False
+        while not done:
+            action, _ = model.predict(obs, deterministic=False)
+            obs, _, done, _, _ = env.step(action)
+            steps += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "inference.steps_per_sec": steps / elapsed,
+        "inference.schedules_per_sec": episodes / elapsed,
+    }
+
+
+def run_suite(sizes, n_envs_list, vectorization="dummy", env_steps=20000, resets=200, rollout_steps=512,
+              inference_episodes=3, inference_max_steps=1000, skip=(), seed=0):
+    metrics = {}
+    for size in sizes:
+        data = generate_dataset(*SIZES[size], seed=seed, max_hours=True)
+        print(f"{size}: {SIZES[size]}")
+        results = {}
+        if "env" not in skip:
+            results.update(bench_env(data, env_steps, resets, seed))
+        if "ppo" not in skip:
+            for n_envs in n_envs_list:
+                results.update(bench_rollout(data, n_envs, rollout_steps, vectorization, seed))
+        if "inference" not in skip:
+            results.update(bench_inference(data, inference_episodes, inference_max_steps, seed))
+        for name, value in results.items():
+            metrics[f"{size}.{name}"] = value
+            print(f"  {name:<40} {value:>14,.2f}")
+    return metrics
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def higher_is_better(name):
+    for suffix, direction in METRIC_DIRECTIONS.items():
+        if name.endswith(suffix):
+            return direction
+    raise ValueError(f"Metric '{name}' has no known direction suffix")
+
+
+def compare(results, baseline, tolerance):
+    """Print each metric against the baseline and return the names that regressed."""
+    regressions = []
+    print(f"{'metric':<52} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name in sorted(results.keys() & baseline.keys()):
+        old, new = baseline[name], results[name]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better(name) else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<52} {old:>14,.2f} {new:>14,.2f} {change:>+8.1%}{flag}")
+
+    for name in sorted(baseline.keys() - results.keys()):
+        print(f"{name:<52} missing from the current results")
+    return regressions
+
+
+def load_metrics(path):
+    with open(path) as f:
+        return json.load(f)["metrics"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--n-envs", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--vectorization", choices=["subproc", "dummy", "batched"], default="dummy")
+    parser.add_argument("--env-steps", type=int, default=20000)
+    parser.add_argument("--resets", type=int, default=200)
+    parser.add_argument("--rollout-steps", type=int, default=512, help="rollout length per env")
+    parser.add_argument("--inference-episodes", type=int, default=3)
+    parser.add_argument("--skip", nargs="+", choices=["env", "ppo", "inference"], default=[])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--results", help="compare an existing results file instead of running the suite")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        metrics = load_metrics(args.results)
+    else:
+        metrics = run_suite(args.sizes, args.n_envs, args.vectorization, args.env_steps, args.resets,
+                            args.rollout_steps, args.inference_episodes, skip=args.skip, seed=args.seed)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"meta": metadata(), "config": vars(args), "metrics": metrics}, f, indent=2)
+            print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        regressions = compare(metrics, load_metrics(args.baseline), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Throughput of vectorized SchedulingEnv rollouts for several worker counts.
+
+Run from the repository root:
+
+    python benchmarks/vec_env_scaling.py --workers 1 4 8 16 --train
+
+For every worker count this reports raw env steps/s with random actions and,
+with --train, the wall-clock time PPO needs to reach --timesteps.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MAX_TEACHERS, MAX_ROOMS, MAX_STUDENTS, TIME_SLOTS
+from EnvFactory import make_scheduling_vec_env
+from RLModel import get_algorithm
+from env_step_benchmark import build_instance
+
+
+def measure_env_throughput(env, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps // env.num_envs):
+        env.step(rng.integers(0, nvec, size=(env.num_envs, len(nvec))))
+    elapsed = time.perf_counter() - start
+    return (steps // env.num_envs) * env.num_envs / elapsed
+
+
+def measure_training_time(env, timesteps, seed=0):
+    model = get_algorithm()("MlpPolicy", env, n_steps=512, batch_size=512, seed=seed, verbose=0)
+    start = time.perf_counter()
+    model.learn(total_timesteps=timesteps)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--vectorization", choices=["subproc", "dummy", "batched"], default="subproc")
+    parser.add_argument("--steps", type=int, default=50000)
+    parser.add_argument("--train", action="store_true", help="also time PPO training to --timesteps")
+    parser.add_argument("--timesteps", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = build_instance(MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS, args.seed)
+
+    print(f"{'workers':>8} {'env steps/s':>12} {'train time (s)':>15}")
+    for n_envs in args.workers:
+        env = make_scheduling_vec_env(*data, n_envs=n_envs, vectorization=args.vectorization, seed=args.seed)
+        steps_per_sec = measure_env_throughput(env, args.steps, args.seed)
+        train_time = measure_training_time(env, args.timesteps, args.seed) if args.train else float("nan")
+        env.close()
+        print(f"{n_envs:>8} {steps_per_sec:>12,.0f} {train_time:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,55 @@
 ﻿MAX_TEACHERS = 7
 MAX_STUDENTS = 20
 MAX_ROOMS = 15
-TIME_SLOTS = 48
\ No newline at end of file
+TIME_SLOTS = 48
+# Length of one time slot (and so one lesson) in hours
+SLOT_HOURS = 0.5
+INSTRUMENTS = ["Piano", "Guitar", "Violin", "Drums"]
+
+# Observation/action space sizes (teachers, students, rooms, slots) the policy
+# is trained with. Smaller instances are zero padded up to these; use None to
+# size the spaces to each instance or "bucket" to round up to powers of two.
+PAD_TO = (MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS)
+
+# Train and run the policy with invalid-action masking (needs sb3-contrib)
+USE_ACTION_MASKING = False
+
+# Parallel rollout collection: number of envs and "subproc", "dummy" or "batched" vectorization
+N_ENVS = 1
+VEC_ENV_TYPE = "subproc"
+SEED = 42
+
+# Seconds of local-search repair applied to the RL schedule in Test_Model (0 disables it)
+REPAIR_TIME_BUDGET = 1.0
+
+# Opt-in training instrumentation: per-phase timers and a cProfile dump of the
+# first PROFILE_STEPS steps to training_profile.prof
+PROFILE_TRAINING = False
+PROFILE_STEPS = 20000
+
+# Periodic training snapshots. With RESUME_TRAINING an interrupted run picks up
+# from the newest one in CHECKPOINT_DIR, otherwise training starts fresh; a run
+# that finishes clears its checkpoints so the next one does not resume it
+RESUME_TRAINING = True
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_FREQ = 20000
+TOTAL_TIMESTEPS = 100000
+
+# Curriculum training on generated instances instead of the CSV dataset: levels
+# of growing (teachers, students, rooms, slots) size, promoted once the mean
+# coverage over CURRICULUM_WINDOW episodes reaches CURRICULUM_PROMOTE_AT
+USE_CURRICULUM = False
+CURRICULUM_LEVELS = [(3, 5, 3, 12), (5, 10, 8, 24), (MAX_TEACHERS, MAX_STUDENTS, MAX_ROOMS, TIME_SLOTS)]
+CURRICULUM_PROMOTE_AT = 0.9
+CURRICULUM_WINDOW = 50
+
+# Model Test_Model and InferenceService schedule with: the SB3 model, or the
+# .npz written by "python NumpyPolicy.py export" to run without torch
+INFERENCE_MODEL = "scheduling_rl_model"
+
+# Off-thread evaluation while training, over the instance directories under
+# EVAL_INSTANCES_DIR (as written by DatasetGenerator --out-dir); None disables it
+EVAL_INSTANCES_DIR = None
+EVAL_FREQ = 20000
+EVAL_EPISODES = 5
+EVAL_WORKERS = 2
\ No newline at end of file
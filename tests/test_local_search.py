@@ -0,0 +1,29 @@
+"""Local search must never lower its own objective.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DatasetGenerator import generate_dataset
+from LocalSearch import repair_schedule
+from Solvers import SchedulingProblem, solve_greedy
+
+
+@pytest.mark.parametrize("weights", [
+    {},
+    {"coverage_weight": 5.0},
+    {"coverage_weight": 0.5, "teacher_weight": 10.0, "room_weight": 5.0},
+])
+@pytest.mark.parametrize("max_hours", [False, True])
+def test_objective_never_decreases(weights, max_hours):
+    problem = SchedulingProblem(*generate_dataset(10, 200, 4, 20, seed=1, max_hours=max_hours))
+    for schedule in ([], solve_greedy(problem).to_schedule()[::2]):
+        _, report = repair_schedule(problem, schedule, time_budget=0.2, **weights)
+        assert report["final_objective"] >= report["initial_objective"]